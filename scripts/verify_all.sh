@@ -18,4 +18,10 @@ PYTHONPATH=./src:${PYTHONPATH:-} python3 -m pytest tests/test_episode.py -v
 echo "==> Running redaction tests"
 PYTHONPATH=./src:${PYTHONPATH:-} python3 -m pytest tests/test_redaction.py -v
 
+echo "==> Running event store tests"
+PYTHONPATH=./src:${PYTHONPATH:-} python3 -m pytest tests/test_event_store.py -v
+
+echo "==> Running database tests"
+PYTHONPATH=./src:${PYTHONPATH:-} python3 -m pytest tests/test_database.py -v
+
 echo "✅ All checks passed"
@@ -7,44 +7,64 @@ CLI commands for Memory Fabric.
 """
 
 import argparse
+import atexit
+import cmd
+import hashlib
+import itertools
 import json
+import os
+import secrets
+import shlex
 import sys
-import uuid
+from datetime import datetime, timezone
+from functools import cached_property
+from operator import itemgetter
 from pathlib import Path
 
-from memory_hub import (
-    create_event_store,
-    create_database,
-    HybridRetrieval,
-    ContextAssembler,
-)
-from memory_hub.episode import (
-    store_episode,
-    retrieve_episodes,
-    assemble_episodes_context,
-    intent_fingerprint,
-    calculate_score,
-    create_episode,
-    mark_episode_used,
-    bump_episode_strength,
-)
+from memory_hub import create_event_store, create_database
+
+
+def cache_key(*parts) -> bytes:
+    """SHA-256 digest identifying a retrieval request."""
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).digest()
+
+
+def print_json(obj):
+    """Stream obj as JSON to stdout; indented only when a human is reading."""
+    indent = 2 if sys.stdout.isatty() else None
+    json.dump(obj, sys.stdout, indent=indent, ensure_ascii=False)
+    sys.stdout.write("\n")
 
 
 class MemoryHubCLI:
     """CLI for Memory Fabric."""
 
+    # Cached results are also invalidated by any memory/entity/edge write;
+    # the TTL only bounds drift in the recency component.
+    CACHE_TTL_SEC = 3600
+
     def __init__(self, data_dir: Path):
         self.data_dir = Path(data_dir)
         self.db_path = self.data_dir / "memory_hub.db"
-        self.events = create_event_store(self.data_dir / "events")
+        # Buffer events and write them out once per invocation
+        self.events = create_event_store(self.data_dir / "events", batched=True)
+        atexit.register(self.events.close)
         self.db = create_database(self.db_path)
-        self.retrieval = HybridRetrieval(self.db, self.events)
-        self.assembler = ContextAssembler(self.retrieval, self.db)
+
+    @cached_property
+    def retrieval(self):
+        from memory_hub.retrieval import HybridRetrieval
+        return HybridRetrieval(self.db, self.events)
+
+    @cached_property
+    def assembler(self):
+        from memory_hub.context_assembler import ContextAssembler
+        return ContextAssembler(self.retrieval, self.db)
 
     def write(self, content: str, memory_type: str = "general", source: str = None,
              importance: float = 0.5, metadata: dict = None):
         """Write a memory."""
-        memory_id = str(uuid.uuid4())[:8]
+        memory_id = secrets.token_hex(4)
 
         # Write to event store
         self.events.append("memory_created", {
@@ -68,9 +88,46 @@ class MemoryHubCLI:
 
         print(f"Memory created: {memory_id}")
 
+    def write_batch(self, stream):
+        """Write memories from NDJSON lines (one memory object per line)."""
+        records = []
+        for line in stream:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            records.append({
+                "memory_id": secrets.token_hex(4),
+                "content": item["content"],
+                "memory_type": item.get("type", "general"),
+                "source": item.get("source"),
+                "importance": item.get("importance", 0.5),
+                "metadata": item.get("metadata") or {},
+            })
+
+        if not records:
+            print("Memories created: 0")
+            return
+
+        event_ids = self.events.append_many([("memory_created", dict(r)) for r in records])
+        for record, event_id in zip(records, event_ids):
+            record["event_id"] = event_id
+        self.db.insert_memories(records)
+
+        print(f"Memories created: {len(records)}")
+
     def search(self, query: str, top_k: int = 10, memory_type: str = None, source: str = None, json_output: bool = False):
         """Search memories."""
-        results = self.retrieval.search(query, top_k=top_k, memory_type=memory_type, source=source)
+        from dataclasses import asdict
+        from memory_hub.retrieval import RetrievalResult
+
+        key = cache_key("search", query, top_k, memory_type, source)
+        cached = self.db.get_cached_results(key, max_age_sec=self.CACHE_TTL_SEC)
+        if cached is not None:
+            results = [RetrievalResult(**r) for r in cached]
+        else:
+            results = self.retrieval.search(query, top_k=top_k, memory_type=memory_type, source=source)
+            self.db.put_cached_results(key, [asdict(r) for r in results], query=query,
+                                       top_k=top_k, memory_type=memory_type, source=source)
 
         if json_output:
             output = [{
@@ -80,42 +137,48 @@ class MemoryHubCLI:
                 "score": r.score,
                 "explanation": r.explanation
             } for r in results]
-            print(json.dumps(output, indent=2, ensure_ascii=False))
+            print_json(output)
         else:
+            write = sys.stdout.write
             for r in results:
-                print(f"\n--- {r.memory_id} (score: {r.score:.2f}) [{r.memory_type}] ---")
-                print(r.content[:200] + "..." if len(r.content) > 200 else r.content)
-                print(f"Explanation: {r.explanation}")
+                content = r.content if len(r.content) <= 200 else f"{r.content[:200]}..."
+                write(f"\n--- {r.memory_id} (score: {r.score:.2f}) [{r.memory_type}] ---\n"
+                      f"{content}\n"
+                      f"Explanation: {r.explanation}\n")
 
     def assemble(self, query: str, max_tokens: int = 4000, memory_type: str = None, source: str = None, json_output: bool = False, with_episodes: bool = False, project: str = None):
         """Assemble context pack."""
-        pack = self.assembler.assemble(
-            query,
-            max_tokens=max_tokens,
-            memory_types=[memory_type] if memory_type else None,
-            source=source
-        )
+        from memory_hub.context_assembler import ContextPack
+
+        key = cache_key("assemble", query, max_tokens, memory_type, source)
+        cached = self.db.get_cached_results(key, max_age_sec=self.CACHE_TTL_SEC)
+        if cached is not None:
+            pack = ContextPack(**cached)
+        else:
+            pack = self.assembler.assemble(
+                query,
+                max_tokens=max_tokens,
+                memory_types=[memory_type] if memory_type else None,
+                source=source
+            )
+            self.db.put_cached_results(key, pack.to_json(), query=query,
+                                       memory_type=memory_type, source=source)
 
         # Prepend episode context if requested
         episode_context = ""
-        included_episode_ids = []
         if with_episodes and project:
+            from memory_hub.episode import assemble_episodes_context, intent_fingerprint, mark_episode_used
+
             fp = intent_fingerprint(query, project)
 
             # Get final episodes AFTER assemble selects them
-            episode_result = assemble_episodes_context(
+            episode_context, included_episode_ids = assemble_episodes_context(
                 query=query,
                 project_id=project,
                 top_k=5,
                 db=self.db
             )
 
-            # Handle new tuple return format (markdown, included_ids)
-            if isinstance(episode_result, tuple):
-                episode_context, included_episode_ids = episode_result
-            else:
-                episode_context = episode_result  # Fallback for empty
-
             # Mark FINAL included episodes as used (post-render selection)
             for ep_id in included_episode_ids:
                 try:
@@ -128,7 +191,7 @@ class MemoryHubCLI:
         if json_output:
             if episode_context:
                 output["episode_context"] = episode_context
-            print(json.dumps(output, indent=2, ensure_ascii=False))
+            print_json(output)
         else:
             if episode_context:
                 print(episode_context)
@@ -150,6 +213,7 @@ class MemoryHubCLI:
     ):
         """Record an episode."""
         import json as json_mod
+        from memory_hub.episode import bump_episode_strength, create_episode, intent_fingerprint, store_episode
 
         # Load steps from JSON file if provided
         path_steps = []
@@ -199,12 +263,14 @@ class MemoryHubCLI:
                 pass  # Best-effort
 
         if json_output:
-            print(json.dumps({"episode_id": episode_id, "score": episode["score"]}, indent=2))
+            print_json({"episode_id": episode_id, "score": episode["score"]})
         else:
             print(f"Episode recorded: {episode_id} (score: {episode['score']})")
 
     def episode_match(self, project: str, prompt: str, top_k: int = 5, json_output: bool = False):
         """Match episodes by prompt."""
+        from memory_hub.episode import retrieve_episodes
+
         results = retrieve_episodes(project, prompt, top_k, self.db)
 
         if json_output:
@@ -215,7 +281,7 @@ class MemoryHubCLI:
                 "score": r.get("score"),
                 "path": r.get("path", [])[:3],
             } for r in results]
-            print(json.dumps(output, indent=2, ensure_ascii=False))
+            print_json(output)
         else:
             if not results:
                 print("No matching episodes found.")
@@ -230,29 +296,26 @@ class MemoryHubCLI:
 
     def summarize(self, query: str = None, memory_type: str = None, json_output: bool = False):
         """Summarize memories."""
-        if memory_type:
-            memories = self.db.get_memories_by_type(memory_type, limit=100)
-        else:
-            memories = self.db.get_all_memories(limit=100)
-
-        by_type = {}
-        for m in memories:
-            mtype = m.get("memory_type", "general")
-            if mtype not in by_type:
-                by_type[mtype] = []
-            by_type[mtype].append(m)
+        # Text output only shows the first 5 per type; JSON keeps up to 100
+        limit_per_type = 100 if json_output else 5
+        rows = self.db.get_memories_grouped(limit_per_type=limit_per_type, memory_type=memory_type)
+        groups = itertools.groupby(rows, key=itemgetter("memory_type"))
 
         if json_output:
-            print(json.dumps(by_type, indent=2, ensure_ascii=False))
+            print_json({
+                mtype: [{k: v for k, v in m.items() if k not in ("rn", "type_count")} for m in mems]
+                for mtype, mems in groups
+            })
         else:
-            for mtype, mems in by_type.items():
-                print(f"\n## {mtype} ({len(mems)} memories)")
-                for m in mems[:5]:
+            for mtype, mems in groups:
+                mems = list(mems)
+                print(f"\n## {mtype} ({mems[0]['type_count']} memories)")
+                for m in mems:
                     print(f"- {m['content'][:100]}...")
 
     def approve(self, target_type: str, target_id: str, proposer: str, reason: str = None):
         """Approve a proposal."""
-        approval_id = f"approval_{uuid.uuid4().hex[:8]}"
+        approval_id = f"approval_{secrets.token_hex(4)}"
 
         self.events.append("approval_proposed", {
             "approval_id": approval_id,
@@ -280,21 +343,18 @@ class MemoryHubCLI:
 
     def gc(self, dry_run: bool = True):
         """Garbage collect expired memories."""
-        from datetime import datetime, timezone
-
         now = datetime.now(timezone.utc).isoformat()
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT memory_id, expires_at FROM memories WHERE expires_at IS NOT NULL")
-        expired = [row for row in cursor.fetchall() if row[1] < now]
 
         if dry_run:
+            expired = self.db.get_expired_memory_ids(now)
             print(f"Would delete {len(expired)} expired memories:")
-            for mem_id, _ in expired:
+            for mem_id in expired:
                 print(f"  - {mem_id}")
         else:
-            for mem_id, _ in expired:
-                self.db.delete_memory(mem_id)
-            print(f"Deleted {len(expired)} expired memories")
+            deleted = self.db.delete_expired_memories(now)
+            if deleted:
+                self.db.optimize()
+            print(f"Deleted {deleted} expired memories")
 
     def export(self, output_file: Path, redact: bool = False):
         """Export all events."""
@@ -305,17 +365,13 @@ class MemoryHubCLI:
         """Show statistics."""
         stats = {
             "events": self.events.count(),
-            "memories": len(self.db.get_all_memories(limit=10000)),
-            "entities": len(self.db.get_entities_by_type("concept")),
-            "approvals": {
-                "active": len(self.db.get_approvals_by_status("active")),
-                "proposed": len(self.db.get_approvals_by_status("proposed")),
-                "deprecated": len(self.db.get_approvals_by_status("deprecated")),
-            }
+            "memories": self.db.count_memories(),
+            "entities": self.db.count_entities_by_type("concept"),
+            "approvals": self.db.count_approvals_by_status(["active", "proposed", "deprecated"]),
         }
 
         if json_output:
-            print(json.dumps(stats, indent=2))
+            print_json(stats)
         else:
             print(f"Events: {stats['events']}")
             print(f"Memories: {stats['memories']}")
@@ -323,21 +379,19 @@ class MemoryHubCLI:
             print(f"Approvals: {stats['approvals']}")
 
 
-def main():
-    """Main CLI entry point."""
-    parser = argparse.ArgumentParser(description="Memory Fabric CLI")
-    parser.add_argument("--data-dir", default="~/.memory_hub", help="Data directory")
-
-    subparsers = parser.add_subparsers(dest="command", required=True)
-
-    # write
+def _add_write_parser(subparsers):
     write_parser = subparsers.add_parser("write", help="Write a memory")
     write_parser.add_argument("content", help="Memory content")
     write_parser.add_argument("--type", default="general", help="Memory type")
     write_parser.add_argument("--source", help="Source")
     write_parser.add_argument("--importance", type=float, default=0.5, help="Importance 0-1")
 
-    # search
+
+def _add_write_batch_parser(subparsers):
+    subparsers.add_parser("write-batch", help="Write memories from NDJSON on stdin")
+
+
+def _add_search_parser(subparsers):
     search_parser = subparsers.add_parser("search", help="Search memories")
     search_parser.add_argument("query", help="Search query")
     search_parser.add_argument("--top-k", type=int, default=10)
@@ -345,7 +399,8 @@ def main():
     search_parser.add_argument("--project", help="Filter by source/project")
     search_parser.add_argument("--json", action="store_true", help="JSON output")
 
-    # assemble
+
+def _add_assemble_parser(subparsers):
     assemble_parser = subparsers.add_parser("assemble", help="Assemble context pack")
     assemble_parser.add_argument("query", help="Query")
     assemble_parser.add_argument("--max-tokens", type=int, default=4000)
@@ -354,7 +409,8 @@ def main():
     assemble_parser.add_argument("--json", action="store_true", help="JSON output")
     assemble_parser.add_argument("--with-episodes", action="store_true", help="Prepend episode context")
 
-    # episode subcommand
+
+def _add_episode_parser(subparsers):
     episode_parser = subparsers.add_parser("episode", help="Episode commands")
     episode_subparsers = episode_parser.add_subparsers(dest="episode_command", required=True)
 
@@ -378,90 +434,280 @@ def main():
     match_parser.add_argument("--k", type=int, default=5, help="Number of results")
     match_parser.add_argument("--json", action="store_true", help="JSON output")
 
-    # summarize
+
+def _add_summarize_parser(subparsers):
     summarize_parser = subparsers.add_parser("summarize", help="Summarize memories")
     summarize_parser.add_argument("--query", help="Query")
     summarize_parser.add_argument("--type", help="Memory type")
     summarize_parser.add_argument("--json", action="store_true", help="JSON output")
 
-    # approve
+
+def _add_approve_parser(subparsers):
     approve_parser = subparsers.add_parser("approve", help="Approve a proposal")
     approve_parser.add_argument("target_type", help="Target type")
     approve_parser.add_argument("target_id", help="Target ID")
     approve_parser.add_argument("proposer", help="Proposer")
     approve_parser.add_argument("--reason", help="Reason")
 
-    # reject
+
+def _add_reject_parser(subparsers):
     reject_parser = subparsers.add_parser("reject", help="Reject a proposal")
     reject_parser.add_argument("approval_id", help="Approval ID")
     reject_parser.add_argument("approver", help="Approver")
     reject_parser.add_argument("--reason", help="Reason")
 
-    # gc
+
+def _add_gc_parser(subparsers):
     gc_parser = subparsers.add_parser("gc", help="Garbage collect")
     gc_parser.add_argument("--dry-run", action="store_true", default=True)
 
-    # export
+
+def _add_export_parser(subparsers):
     export_parser = subparsers.add_parser("export", help="Export events")
     export_parser.add_argument("output", help="Output file")
     export_parser.add_argument("--redact", action="store_true", help="Redact sensitive data")
 
-    # stats
+
+def _add_stats_parser(subparsers):
     stats_parser = subparsers.add_parser("stats", help="Show statistics")
     stats_parser.add_argument("--json", action="store_true", help="JSON output")
 
+
+def _add_shell_parser(subparsers):
+    subparsers.add_parser("shell", help="Interactive shell reusing one process")
+
+
+def _add_serve_parser(subparsers):
+    serve_parser = subparsers.add_parser("serve", help="Serve commands over a unix socket")
+    serve_parser.add_argument("--socket", help="Socket path (default: $XDG_RUNTIME_DIR/memory_hub.sock)")
+
+
+# Command name -> function adding that command's subparser
+COMMAND_PARSERS = {
+    "write": _add_write_parser,
+    "write-batch": _add_write_batch_parser,
+    "search": _add_search_parser,
+    "assemble": _add_assemble_parser,
+    "episode": _add_episode_parser,
+    "summarize": _add_summarize_parser,
+    "approve": _add_approve_parser,
+    "reject": _add_reject_parser,
+    "gc": _add_gc_parser,
+    "export": _add_export_parser,
+    "stats": _add_stats_parser,
+    "shell": _add_shell_parser,
+    "serve": _add_serve_parser,
+}
+
+
+def build_parser(commands: list[str] = None) -> argparse.ArgumentParser:
+    """
+    Build the argument parser.
+
+    Args:
+        commands: Only add subparsers for these commands (default: all)
+    """
+    parser = argparse.ArgumentParser(description="Memory Fabric CLI")
+    parser.add_argument("--data-dir", default="~/.memory_hub", help="Data directory")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name in commands or COMMAND_PARSERS:
+        COMMAND_PARSERS[name](subparsers)
+
+    return parser
+
+
+def peek_command(argv: list[str]) -> str | None:
+    """Return the subcommand name in argv, skipping global options."""
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--data-dir":
+            i += 2
+        elif arg.startswith("--data-dir="):
+            i += 1
+        else:
+            return arg
+    return None
+
+
+# Episode subcommand -> handler(cli, args)
+EPISODE_DISPATCH = {
+    "record": lambda cli, a: cli.episode_record(
+        project=a.project,
+        intent=a.intent,
+        outcome=a.outcome,
+        attempts=a.attempts,
+        rollbacks=a.rollbacks,
+        error_signatures=a.error_signature,
+        steps=a.step,
+        steps_json=a.steps_json,
+        evidence_json=a.evidence_json,
+        json_output=a.json
+    ),
+    "match": lambda cli, a: cli.episode_match(
+        project=a.project,
+        prompt=a.prompt,
+        top_k=a.k,
+        json_output=a.json
+    ),
+}
+
+# Command -> handler(cli, args)
+DISPATCH = {
+    "write": lambda cli, a: cli.write(a.content, a.type, a.source, a.importance),
+    "write-batch": lambda cli, a: cli.write_batch(sys.stdin),
+    "search": lambda cli, a: cli.search(a.query, a.top_k, a.type, a.project, a.json),
+    "assemble": lambda cli, a: cli.assemble(a.query, a.max_tokens, a.type, a.project, a.json,
+                                            a.with_episodes, a.project),
+    "summarize": lambda cli, a: cli.summarize(a.query, a.type, a.json),
+    "approve": lambda cli, a: cli.approve(a.target_type, a.target_id, a.proposer, a.reason),
+    "reject": lambda cli, a: cli.reject(a.approval_id, a.approver, a.reason),
+    "gc": lambda cli, a: cli.gc(a.dry_run),
+    "export": lambda cli, a: cli.export(Path(a.output), a.redact),
+    "stats": lambda cli, a: cli.stats(a.json),
+    "episode": lambda cli, a: EPISODE_DISPATCH[a.episode_command](cli, a),
+}
+
+
+def run_command(cli: MemoryHubCLI, args: argparse.Namespace):
+    """Execute a parsed command against an existing CLI instance."""
+    handler = DISPATCH.get(args.command)
+    if handler is None:
+        print(f"Unknown command: {args.command}", file=sys.stderr)
+        sys.exit(1)
+    handler(cli, args)
+
+
+# Commands that cannot run inside shell/serve: the sessions themselves, and
+# write-batch, which would read the session's own stdin as its payload
+SESSION_EXCLUDED = ("shell", "serve", "write-batch")
+
+
+def execute_argv(cli: MemoryHubCLI, parser: argparse.ArgumentParser, argv: list[str]) -> int:
+    """Parse and run one command inside a long-lived process.
+
+    Returns:
+        Exit code (0 on success)
+    """
+    try:
+        args = parser.parse_args(argv)
+        if args.command in SESSION_EXCLUDED:
+            print(f"Cannot run {args.command} from inside a session", file=sys.stderr)
+            return 1
+        run_command(cli, args)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        # Keep the session alive (and serve replying) when a command fails
+        print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        cli.events.flush()
+    return 0
+
+
+class MemoryHubShell(cmd.Cmd):
+    """Interactive shell that keeps one MemoryHubCLI open across commands."""
+
+    intro = "Memory Fabric shell. Type a command (e.g. 'search python'), 'help' or 'exit'."
+    prompt = "memory-hub> "
+
+    def __init__(self, cli: MemoryHubCLI, parser: argparse.ArgumentParser):
+        super().__init__()
+        self.cli = cli
+        self.parser = parser
+
+    def default(self, line: str):
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"Parse error: {e}", file=sys.stderr)
+            return
+        execute_argv(self.cli, self.parser, argv)
+
+    def do_help(self, arg: str):
+        self.parser.print_help()
+
+    def do_exit(self, arg: str):
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, arg: str):
+        print()
+        return True
+
+    def emptyline(self):
+        pass
+
+
+def serve(cli: MemoryHubCLI, parser: argparse.ArgumentParser, socket_path: Path):
+    """Serve newline-delimited JSON requests {"argv": [...]} on a unix socket.
+
+    Each request gets one JSON line back: {"code": int, "output": str}.
+    """
+    import contextlib
+    import io
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    argv = json.loads(line).get("argv", [])
+                except (json.JSONDecodeError, AttributeError):
+                    response = {"code": 2, "output": "invalid request"}
+                else:
+                    buf = io.StringIO()
+                    with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+                        code = execute_argv(cli, parser, argv)
+                    response = {"code": code, "output": buf.getvalue()}
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        socket_path.unlink()
+    with socketserver.UnixStreamServer(str(socket_path), Handler) as server:
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+
+
+def main():
+    """Main CLI entry point."""
+    # Only build the subparser that will actually be used; help, errors and
+    # interactive sessions need the full parser.
+    command = peek_command(sys.argv[1:])
+    if command in COMMAND_PARSERS and command not in ("shell", "serve"):
+        parser = build_parser([command])
+    else:
+        parser = build_parser()
     args = parser.parse_args()
 
     # Expand data dir
-    data_dir = Path(args.data_dir).expanduser()
-    data_dir.mkdir(parents=True, exist_ok=True)
+    data_dir = Path(os.path.expanduser(args.data_dir))
+    if not os.path.isdir(data_dir):
+        os.makedirs(data_dir, exist_ok=True)
 
     # Create CLI
     cli = MemoryHubCLI(data_dir)
 
     # Execute command
-    if args.command == "write":
-        cli.write(args.content, args.type, args.source, args.importance)
-    elif args.command == "search":
-        cli.search(args.query, args.top_k, args.type, args.project, args.json)
-    elif args.command == "assemble":
-        cli.assemble(args.query, args.max_tokens, args.type, args.project, args.json, args.with_episodes, args.project)
-    elif args.command == "summarize":
-        cli.summarize(args.query, args.type, args.json)
-    elif args.command == "approve":
-        cli.approve(args.target_type, args.target_id, args.proposer, args.reason)
-    elif args.command == "reject":
-        cli.reject(args.approval_id, args.approver, args.reason)
-    elif args.command == "gc":
-        cli.gc(args.dry_run)
-    elif args.command == "export":
-        cli.export(Path(args.output), args.redact)
-    elif args.command == "stats":
-        cli.stats(args.json)
-    elif args.command == "episode":
-        if args.episode_command == "record":
-            cli.episode_record(
-                project=args.project,
-                intent=args.intent,
-                outcome=args.outcome,
-                attempts=args.attempts,
-                rollbacks=args.rollbacks,
-                error_signatures=args.error_signature,
-                steps=args.step,
-                steps_json=args.steps_json,
-                evidence_json=args.evidence_json,
-                json_output=args.json
-            )
-        elif args.episode_command == "match":
-            cli.episode_match(
-                project=args.project,
-                prompt=args.prompt,
-                top_k=args.k,
-                json_output=args.json
-            )
+    if args.command == "shell":
+        MemoryHubShell(cli, parser).cmdloop()
+    elif args.command == "serve":
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or data_dir
+        serve(cli, parser, Path(args.socket or Path(runtime_dir) / "memory_hub.sock"))
     else:
-        print(f"Unknown command: {args.command}", file=sys.stderr)
-        sys.exit(1)
+        run_command(cli, args)
 
 
 if __name__ == "__main__":
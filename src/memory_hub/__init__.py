@@ -11,10 +11,20 @@ Components:
 - Context Assembler: Token-budgeted context packs
 """
 
-from .event_store import EventStore, create_event_store
-from .database import MemoryDatabase, create_database
-from .retrieval import HybridRetrieval, RetrievalResult
-from .context_assembler import ContextAssembler, ContextPack
+import importlib
+
+# Public names are resolved on first access so that importing one
+# component (e.g. the event store) does not pay for the others.
+_EXPORTS = {
+    "EventStore": ".event_store",
+    "create_event_store": ".event_store",
+    "MemoryDatabase": ".database",
+    "create_database": ".database",
+    "HybridRetrieval": ".retrieval",
+    "RetrievalResult": ".retrieval",
+    "ContextAssembler": ".context_assembler",
+    "ContextPack": ".context_assembler",
+}
 
 __version__ = "0.1.0"
 
@@ -28,3 +38,16 @@ __all__ = [
     "ContextAssembler",
     "ContextPack",
 ]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        module = importlib.import_module(_EXPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
@@ -6,8 +6,12 @@ from __future__ import annotations
 Context Assembler that outputs ready-to-inject context packs with token budget control.
 """
 
+import io
 import json
+from bisect import bisect_right
+from collections import defaultdict
 from dataclasses import dataclass
+from itertools import accumulate
 from typing import Any
 
 
@@ -24,43 +28,38 @@ class ContextPack:
 
     def to_markdown(self) -> str:
         """Convert to markdown format for easy reading."""
-        lines = ["# Context Pack\n"]
+        buf = io.StringIO()
+        w = buf.write
+        w("# Context Pack\n")
 
         if self.query:
-            lines.append(f"**Query:** {self.query}\n")
+            w(f"\n**Query:** {self.query}\n")
 
-        lines.append(f"**Token Budget:** {self.token_used}/{self.token_budget} ({self.token_remaining} remaining)\n")
+        w(f"\n**Token Budget:** {self.token_used}/{self.token_budget} ({self.token_remaining} remaining)\n")
 
         if self.summaries:
-            lines.append("\n## Summaries\n")
+            w("\n\n## Summaries\n")
             for s in self.summaries:
-                lines.append(f"- {s.get('content', '')}")
+                w(f"\n- {s.get('content', '')}")
 
         if self.entities:
-            lines.append("\n## Entities\n")
+            w("\n\n## Entities\n")
             for e in self.entities:
-                lines.append(f"- **{e.get('name', '')}** ({e.get('type', '')}): {e.get('description', '')}")
+                w(f"\n- **{e.get('name', '')}** ({e.get('type', '')}): {e.get('description', '')}")
 
         if self.memories:
-            lines.append("\n## Memories\n")
+            w("\n\n## Memories\n")
             for m in self.memories:
                 score_pct = int(m.get('score', 0) * 100)
-                lines.append(f"### [{m.get('type', 'general')}] {m.get('id', '')} (score: {score_pct}%)\n")
-                lines.append(f"{m.get('content', '')}\n")
+                w(f"\n### [{m.get('type', 'general')}] {m.get('id', '')} (score: {score_pct}%)\n")
+                w(f"\n{m.get('content', '')}\n")
 
-        return "\n".join(lines)
+        return buf.getvalue()
 
     def to_json(self) -> dict:
         """Convert to JSON."""
-        return {
-            "query": self.query,
-            "memories": self.memories,
-            "summaries": self.summaries,
-            "entities": self.entities,
-            "token_budget": self.token_budget,
-            "token_used": self.token_used,
-            "token_remaining": self.token_remaining
-        }
+        # Every field is JSON-safe, so the instance dict is the payload
+        return dict(self.__dict__)
 
 
 class ContextAssembler:
@@ -79,6 +78,7 @@ class ContextAssembler:
 
     # Priority order (higher priority = included first)
     PRIORITY_TYPES = ["decision", "architecture", "implementation", "general"]
+    PRIORITY_MAP = {t: i for i, t in enumerate(PRIORITY_TYPES)}
 
     def __init__(self, retrieval, database):
         """
@@ -110,42 +110,37 @@ class ContextAssembler:
         """
         max_chars = max_tokens * self.CHARS_PER_TOKEN
 
-        # Get all relevant memories
-        all_memories = []
-        types_to_search = memory_types or [None]
-
-        for mem_type in types_to_search:
-            results = self.retrieval.search(
-                query,
-                top_k=30,
-                memory_type=mem_type if mem_type != "all" else None,
-                source=source,
-                use_graph=True
-            )
-            all_memories.extend(results)
+        # Get all relevant memories in one retrieval call ("all" disables the type filter)
+        if not memory_types or "all" in memory_types:
+            memory_types = None
+        all_memories = self.retrieval.search(
+            query,
+            top_k=30 * len(memory_types) if memory_types else 30,
+            source=source,
+            use_graph=True,
+            memory_types=memory_types
+        )
 
         # Sort by priority type then score
-        def sort_key(m):
-            type_order = self.PRIORITY_TYPES.index(m.memory_type) if m.memory_type in self.PRIORITY_TYPES else 999
-            return (type_order, -m.score)
-        all_memories.sort(key=sort_key)
-
-        # Select memories within budget
-        memories = []
-        used_chars = 0
-
-        for mem in all_memories:
-            mem_chars = len(mem.content)
-            if used_chars + mem_chars <= max_chars:
-                memories.append({
-                    "id": mem.memory_id,
-                    "content": mem.content,
-                    "type": mem.memory_type,
-                    "source": mem.source,
-                    "score": mem.score,
-                    "explanation": mem.explanation
-                })
-                used_chars += mem_chars
+        priority = self.PRIORITY_MAP
+        all_memories.sort(key=lambda m: (priority.get(m.memory_type, 999), -m.score))
+
+        # Select memories within budget (greedy in priority order, stop once full):
+        # the cutoff is the last prefix whose running length still fits
+        running_chars = list(accumulate(len(mem.content) for mem in all_memories))
+        cutoff = bisect_right(running_chars, max_chars)
+        used_chars = running_chars[cutoff - 1] if cutoff else 0
+        memories = [
+            {
+                "id": mem.memory_id,
+                "content": mem.content,
+                "type": mem.memory_type,
+                "source": mem.source,
+                "score": mem.score,
+                "explanation": mem.explanation
+            }
+            for mem in all_memories[:cutoff]
+        ]
 
         # Get entities if requested
         entities = []
@@ -173,8 +168,7 @@ class ContextAssembler:
 
         # Search for entities related to query
         try:
-            all_entities = self.db.get_entities_by_type("concept")
-            for entity in all_entities[:limit]:
+            for entity in self.db.get_entities_by_type_cached("concept", limit=limit):
                 entities.append({
                     "id": entity["entity_id"],
                     "name": entity["name"],
@@ -192,20 +186,18 @@ class ContextAssembler:
         summaries = []
 
         # Group by type
-        by_type = {}
+        by_type = defaultdict(list)
         for mem in memories:
-            mtype = mem.get("type", "general")
-            if mtype not in by_type:
-                by_type[mtype] = []
-            by_type[mtype].append(mem)
+            by_type[mem.get("type", "general")].append(mem)
 
-        # Create summary for each type
+        # Create summary for each type with more than one memory
         for mtype, mems in by_type.items():
-            if len(mems) > 1:
-                content_parts = [m["content"][:200] for m in mems[:3]]
-                summaries.append({
-                    "type": mtype,
-                    "content": f"{len(mems)} {mtype} memories found. Key points: " + " | ".join(content_parts)
-                })
+            if len(mems) <= 1:
+                continue
+            key_points = " | ".join(m["content"][:200] for m in mems[:3])
+            summaries.append({
+                "type": mtype,
+                "content": f"{len(mems)} {mtype} memories found. Key points: {key_points}"
+            })
 
         return summaries
@@ -15,26 +15,86 @@ SQLite database with:
 import json
 import re
 import sqlite3
-from datetime import datetime, timezone
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 
+# Shared statement text so every caller hits the same sqlite3 statement cache entry
+_INSERT_MEMORY_SQL = """
+    INSERT INTO memories (memory_id, content, memory_type, source, importance,
+                          created_at, updated_at, expires_at, metadata_json, event_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# Compact, non-ASCII-escaping encoder shared by every JSON column write
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+_TOKEN_RE = re.compile(r"\w+")
+_MAX_FTS_TOKENS = 20
+
+# IDs bound per IN (...) list; the neighbor query binds each chunk twice, which
+# keeps it under SQLite's historical 999-parameter limit
+_MAX_IN_PARAMS = 400
+
+
+# (second, date/time prefix) reused by _utc_now_iso until the clock ticks
+# over; one tuple, so threads replacing it never mix one second's prefix
+# with another's
+_now_cache = (None, "")
+
+
+def _utc_now_iso() -> str:
+    """Current UTC time as ISO 8601 with microseconds, e.g. 2026-01-02T03:04:05.000000+00:00.
+
+    Matches datetime.now(timezone.utc).isoformat(), except that the fraction
+    is always present (isoformat() drops it when the microseconds are 0).
+    Only the microseconds are formatted per call; the date/time prefix is
+    rebuilt once per second, which is far cheaper than a datetime object.
+    """
+    global _now_cache
+    now = time.time()
+    second = int(now)
+    cached_second, prefix = _now_cache
+    if second != cached_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        _now_cache = (second, prefix)
+    return f"{prefix}.{int((now - second) * 1_000_000):06d}+00:00"
+
+
+def _rows_as_dicts(cursor: sqlite3.Cursor) -> list[dict]:
+    """Materialize a cursor as dicts, reading column names once per statement.
+
+    dict(sqlite3.Row) looks every value up by name; zipping against
+    cursor.description skips that per-row work.
+    """
+    cols = tuple(d[0] for d in cursor.description)
+    return [dict(zip(cols, row)) for row in cursor]
+
+
+@lru_cache(maxsize=1024)
 def fts_sanitize(query: str) -> str:
     """
     Sanitize user query for FTS5 MATCH.
 
     FTS5 has strict syntax - punctuation breaks it.
     This extracts safe alphanumeric tokens and joins with OR for better recall.
+    Results are cached, since the same queries recur across searches.
     """
     if not query:
         return ""
 
-    # Extract alphanumeric tokens (including CJK characters)
-    tokens = re.findall(r"[\w]+", query.lower())
-
-    # Dedupe and limit
-    tokens = list(dict.fromkeys(tokens))[:20]
+    # Extract alphanumeric tokens (including CJK characters),
+    # dedupe and stop at the limit
+    tokens = {}
+    for token in _TOKEN_RE.findall(query.lower()):
+        tokens[token] = None
+        if len(tokens) == _MAX_FTS_TOKENS:
+            break
 
     if not tokens:
         return ""
@@ -55,15 +115,72 @@ class MemoryDatabase:
     - approvals: proposal lifecycle management
     - traces: execution traces for debugging
     - eval_runs: evaluation results
+    - retrieval_cache: exact-match cache of search/assemble results
     """
 
+    # FTS candidates fetched per requested row when type/source filters apply
+    FTS_FILTER_OVERFETCH = 10
+
     def __init__(self, db_path: Path):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        if not self.db_path.parent.is_dir():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection per thread so WAL readers do not serialize on a
+        # shared connection; an in-memory database only exists inside the
+        # connection that created it, so that one stays shared.
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._shared = str(self.db_path) == ":memory:"
+        self._main_conn = self._local.conn = self._connect()
+        # Bumped on every entity write; keys the get_entities_by_type_cached entry
+        self._entities_version = 0
+        self._entities_cache = None
         self._init_schema()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use."""
+        if self._shared:
+            return self._main_conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @property
+    def _tx_depth(self) -> int:
+        return getattr(self._local, "tx_depth", 0)
+
+    @_tx_depth.setter
+    def _tx_depth(self, value: int):
+        self._local.tx_depth = value
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        self._configure(conn)
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _configure(self, conn: sqlite3.Connection):
+        """Apply connection PRAGMAs.
+
+        WAL lets readers run alongside a writer and turns each commit into a
+        single log append; synchronous=NORMAL only syncs at checkpoints.
+        busy_timeout makes a second writer wait instead of failing at once.
+        """
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        cursor.execute("PRAGMA wal_autocheckpoint=1000")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA busy_timeout=5000")
+
     def _init_schema(self):
         """Initialize database schema."""
         cursor = self.conn.cursor()
@@ -85,39 +202,52 @@ class MemoryDatabase:
             )
         """)
 
-        # FTS5 full-text index
+        # FTS5 full-text index over content only; memory_type is carried
+        # unindexed and filters run against the base table. detail=column
+        # drops position lists (queries are OR'd tokens, never phrases).
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'memories_fts'")
+        row = cursor.fetchone()
+        rebuild_fts = bool(row) and "detail=column" not in row[0]
+        if rebuild_fts:
+            # Older databases indexed memory_id/source too; rebuild from memories
+            for trigger in ("memories_ai", "memories_ad", "memories_au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute("DROP TABLE memories_fts")
+
         cursor.execute("""
             CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
-                memory_id,
                 content,
-                memory_type,
-                source,
+                memory_type UNINDEXED,
                 content='memories',
-                content_rowid='id'
+                content_rowid='id',
+                detail=column
             )
         """)
+        if rebuild_fts:
+            cursor.execute("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')")
 
         # Triggers to keep FTS in sync
         cursor.execute("""
             CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
-                INSERT INTO memories_fts(rowid, memory_id, content, memory_type, source)
-                VALUES (new.id, new.memory_id, new.content, new.memory_type, new.source);
+                INSERT INTO memories_fts(rowid, content, memory_type)
+                VALUES (new.id, new.content, new.memory_type);
             END
         """)
 
         cursor.execute("""
             CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
-                INSERT INTO memories_fts(memories_fts, rowid, memory_id, content, memory_type, source)
-                VALUES ('delete', old.id, old.memory_id, old.content, old.memory_type, old.source);
+                INSERT INTO memories_fts(memories_fts, rowid, content, memory_type)
+                VALUES ('delete', old.id, old.content, old.memory_type);
             END
         """)
 
+        # Only re-index when an indexed column changes (not on importance/metadata edits)
         cursor.execute("""
-            CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
-                INSERT INTO memories_fts(memories_fts, rowid, memory_id, content, memory_type, source)
-                VALUES ('delete', old.id, old.memory_id, old.content, old.memory_type, old.source);
-                INSERT INTO memories_fts(rowid, memory_id, content, memory_type, source)
-                VALUES (new.id, new.memory_id, new.content, new.memory_type, new.source);
+            CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE OF content, memory_type ON memories BEGIN
+                INSERT INTO memories_fts(memories_fts, rowid, content, memory_type)
+                VALUES ('delete', old.id, old.content, old.memory_type);
+                INSERT INTO memories_fts(rowid, content, memory_type)
+                VALUES (new.id, new.content, new.memory_type);
             END
         """)
 
@@ -188,6 +318,44 @@ class MemoryDatabase:
             )
         """)
 
+        # FTS5 index for search_traces (operation names and error messages)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'traces_fts'")
+        populate_traces_fts = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS traces_fts USING fts5(
+                operation_name,
+                error_message,
+                content='traces',
+                content_rowid='id',
+                detail=column
+            )
+        """)
+        if populate_traces_fts:
+            cursor.execute("INSERT INTO traces_fts(traces_fts) VALUES ('rebuild')")
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS traces_ai AFTER INSERT ON traces BEGIN
+                INSERT INTO traces_fts(rowid, operation_name, error_message)
+                VALUES (new.id, new.operation_name, new.error_message);
+            END
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS traces_ad AFTER DELETE ON traces BEGIN
+                INSERT INTO traces_fts(traces_fts, rowid, operation_name, error_message)
+                VALUES ('delete', old.id, old.operation_name, old.error_message);
+            END
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS traces_au AFTER UPDATE OF operation_name, error_message ON traces BEGIN
+                INSERT INTO traces_fts(traces_fts, rowid, operation_name, error_message)
+                VALUES ('delete', old.id, old.operation_name, old.error_message);
+                INSERT INTO traces_fts(rowid, operation_name, error_message)
+                VALUES (new.id, new.operation_name, new.error_message);
+            END
+        """)
+
         # Eval runs table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS eval_runs (
@@ -206,13 +374,76 @@ class MemoryDatabase:
             )
         """)
 
+        # Retrieval cache (exact query hash -> serialized results)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS retrieval_cache (
+                query_hash BLOB PRIMARY KEY,
+                query TEXT,
+                top_k INTEGER,
+                memory_type TEXT,
+                source TEXT,
+                results_json TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+        # Any change to scored data invalidates cached results
+        for table in ("memories", "entities", "edges"):
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_cache_{event[0].lower()}
+                    AFTER {event} ON {table} BEGIN
+                        DELETE FROM retrieval_cache;
+                    END
+                """)
+
         # Create indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_memories_type ON memories(memory_type)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_memories_source ON memories(source)")
+        # memory_type lookups use the leading column of idx_memories_type_imp_created
+        cursor.execute("DROP INDEX IF EXISTS idx_memories_type")
+        # Source lookups share the listing order too; the wider index still
+        # serves plain source equality, so the old one is dropped
+        cursor.execute("DROP INDEX IF EXISTS idx_memories_source")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_source_imp_created
+            ON memories(source, importance DESC, created_at DESC)
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_memories_created ON memories(created_at)")
+        # Cover the "ORDER BY importance DESC, created_at DESC" listings so the
+        # sort is read off the index instead of a temp B-tree
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_type_imp_created
+            ON memories(memory_type, importance DESC, created_at DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_type_source_imp_created
+            ON memories(memory_type, source, importance DESC, created_at DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_episode_outcome_score
+            ON memories(source, json_extract(metadata_json, '$.outcome'),
+                        json_extract(metadata_json, '$.score'), created_at)
+            WHERE memory_type = 'episode'
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_imp_created
+            ON memories(importance DESC, created_at DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_expires ON memories(expires_at)
+            WHERE expires_at IS NOT NULL
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(entity_type)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_source ON edges(source_entity_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(target_entity_id)")
+        # Covering indexes: both halves of get_neighbors read edges from the index alone
+        cursor.execute("DROP INDEX IF EXISTS idx_edges_source")
+        cursor.execute("DROP INDEX IF EXISTS idx_edges_target")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_edges_source_target
+            ON edges(source_entity_id, target_entity_id, relationship_type, weight)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_edges_target_source
+            ON edges(target_entity_id, source_entity_id, relationship_type, weight)
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_approvals_status ON approvals(status)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_traces_trace ON traces(trace_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_eval_runs_type ON eval_runs(eval_type)")
@@ -220,7 +451,33 @@ class MemoryDatabase:
         self.conn.commit()
 
     def _now(self) -> str:
-        return datetime.now(timezone.utc).isoformat()
+        return _utc_now_iso()
+
+    def _commit(self):
+        """Commit unless an enclosing transaction() will do it."""
+        if not self._tx_depth:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction (and one WAL sync).
+
+        Write methods called inside the block skip their own commit; the
+        outermost block commits on success and rolls back on error.
+        """
+        if not self._tx_depth:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            if not self._tx_depth:
+                self.conn.rollback()
+            raise
+        self._tx_depth -= 1
+        if not self._tx_depth:
+            self.conn.commit()
 
     # ===== Memory Operations =====
 
@@ -230,15 +487,31 @@ class MemoryDatabase:
         """Insert a new memory."""
         cursor = self.conn.cursor()
         now = self._now()
-        cursor.execute("""
-            INSERT INTO memories (memory_id, content, memory_type, source, importance,
-                                created_at, updated_at, expires_at, metadata_json, event_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (memory_id, content, memory_type, source, importance, now, now,
-              expires_at, json.dumps(metadata) if metadata else None, event_id))
-        self.conn.commit()
+        cursor.execute(_INSERT_MEMORY_SQL, (memory_id, content, memory_type, source, importance, now, now,
+              expires_at, _dumps(metadata) if metadata else None, event_id))
+        self._commit()
         return cursor.lastrowid
 
+    def insert_memories(self, memories: list[dict]) -> int:
+        """Insert many memories in a single transaction.
+
+        Args:
+            memories: Dicts with the insert_memory keyword arguments
+
+        Returns:
+            Number of rows inserted
+        """
+        now = self._now()
+        rows = [
+            (m["memory_id"], m["content"], m.get("memory_type", "general"), m.get("source"),
+             m.get("importance", 0.5), now, now, m.get("expires_at"),
+             _dumps(m["metadata"]) if m.get("metadata") else None, m.get("event_id"))
+            for m in memories
+        ]
+        with self.transaction():
+            self.conn.executemany(_INSERT_MEMORY_SQL, rows)
+        return len(rows)
+
     def update_memory(self, memory_id: str, content: str = None, importance: float = None,
                      metadata: dict = None) -> bool:
         """Update an existing memory."""
@@ -254,7 +527,7 @@ class MemoryDatabase:
             params.append(importance)
         if metadata is not None:
             updates.append("metadata_json = ?")
-            params.append(json.dumps(metadata))
+            params.append(_dumps(metadata))
 
         updates.append("updated_at = ?")
         params.append(self._now())
@@ -263,16 +536,64 @@ class MemoryDatabase:
         cursor.execute(f"""
             UPDATE memories SET {', '.join(updates)} WHERE memory_id = ?
         """, params)
-        self.conn.commit()
+        self._commit()
         return cursor.rowcount > 0
 
+    def bump_episode_strengths(self, episode_ids: list[str], delta: float, cap: float = 1.0) -> list[str]:
+        """Raise the JSON 'strength' of episode memories in place, capped at cap.
+
+        Episodes without a strength are treated as 0.5. Rows whose content
+        is not a JSON object are left alone.
+
+        Returns:
+            The ids that were updated, in the order given
+        """
+        if not episode_ids:
+            return []
+        placeholders = ", ".join("?" * len(episode_ids))
+        where = f"""
+            memory_id IN ({placeholders})
+            AND CASE WHEN json_valid(content) THEN json_type(content) END = 'object'
+        """
+        cursor = self.conn.cursor()
+        with self.transaction():
+            cursor.execute(f"SELECT memory_id FROM memories WHERE {where}", episode_ids)
+            found = {row[0] for row in cursor}
+            cursor.execute(f"""
+                UPDATE memories
+                SET content = json_set(content, '$.strength',
+                        MIN(?, COALESCE(json_extract(content, '$.strength'), 0.5) + ?)),
+                    updated_at = ?
+                WHERE {where}
+            """, [cap, delta, self._now()] + list(episode_ids))
+        return [episode_id for episode_id in episode_ids if episode_id in found]
+
     def delete_memory(self, memory_id: str) -> bool:
         """Delete a memory."""
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM memories WHERE memory_id = ?", (memory_id,))
-        self.conn.commit()
+        self._commit()
         return cursor.rowcount > 0
 
+    def get_expired_memory_ids(self, now: str) -> list[str]:
+        """Get IDs of memories whose expires_at is before now."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT memory_id FROM memories
+            WHERE expires_at IS NOT NULL AND expires_at < ?
+        """, (now,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def delete_expired_memories(self, now: str) -> int:
+        """Delete all memories whose expires_at is before now in one statement."""
+        cursor = self.conn.cursor()
+        with self.transaction():
+            cursor.execute("""
+                DELETE FROM memories
+                WHERE expires_at IS NOT NULL AND expires_at < ?
+            """, (now,))
+        return cursor.rowcount
+
     def get_memory(self, memory_id: str) -> dict | None:
         """Get a memory by ID."""
         cursor = self.conn.cursor()
@@ -280,7 +601,8 @@ class MemoryDatabase:
         row = cursor.fetchone()
         return dict(row) if row else None
 
-    def search_memories_fts(self, query: str, limit: int = 10, memory_type: str = None, source: str = None) -> list[dict]:
+    def search_memories_fts(self, query: str, limit: int = 10, memory_type: str = None, source: str = None,
+                            memory_types: list[str] = None) -> list[dict]:
         """Full-text search memories.
 
         Args:
@@ -288,9 +610,10 @@ class MemoryDatabase:
             limit: Max results
             memory_type: Optional type filter
             source: Optional source/project filter
+            memory_types: Optional list of types, any of which may match
 
         Returns:
-            List of memory dicts with rank
+            List of memory dicts with rank (bm25, lower is better)
         """
         # Sanitize query for FTS5 - removes punctuation that breaks MATCH
         safe_query = fts_sanitize(query)
@@ -299,46 +622,57 @@ class MemoryDatabase:
         if not safe_query:
             return []
 
-        cursor = self.conn.cursor()
+        filters = []
+        params = []
+        if memory_type:
+            filters.append("m.memory_type = ?")
+            params.append(memory_type)
+        if memory_types:
+            filters.append(f"m.memory_type IN ({', '.join('?' * len(memory_types))})")
+            params.extend(memory_types)
+        if source:
+            filters.append("m.source = ?")
+            params.append(source)
+
+        # Let MATCH drive the plan inside a CTE, then filter the (overfetched)
+        # candidates. Putting the filters next to MATCH lets the planner
+        # start from the memories indexes and probe FTS row by row instead,
+        # so that query is only the fallback for a short filtered result.
+        inner_limit = limit * self.FTS_FILTER_OVERFETCH if filters else limit
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
 
-        if memory_type and source:
-            cursor.execute("""
-                SELECT m.*, fts.rank
-                FROM memories_fts fts
-                JOIN memories m ON m.memory_id = fts.memory_id
-                WHERE memories_fts MATCH ? AND m.memory_type = ? AND m.source = ?
-                ORDER BY fts.rank
-                LIMIT ?
-            """, (safe_query, memory_type, source, limit))
-        elif memory_type:
-            cursor.execute("""
-                SELECT m.*, fts.rank
-                FROM memories_fts fts
-                JOIN memories m ON m.memory_id = fts.memory_id
-                WHERE memories_fts MATCH ? AND m.memory_type = ?
-                ORDER BY fts.rank
-                LIMIT ?
-            """, (safe_query, memory_type, limit))
-        elif source:
-            cursor.execute("""
-                SELECT m.*, fts.rank
-                FROM memories_fts fts
-                JOIN memories m ON m.memory_id = fts.memory_id
-                WHERE memories_fts MATCH ? AND m.source = ?
-                ORDER BY fts.rank
-                LIMIT ?
-            """, (safe_query, source, limit))
-        else:
-            cursor.execute("""
-                SELECT m.*, fts.rank
-                FROM memories_fts fts
-                JOIN memories m ON m.memory_id = fts.memory_id
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            WITH fts AS (
+                SELECT rowid, bm25(memories_fts) AS score
+                FROM memories_fts
                 WHERE memories_fts MATCH ?
-                ORDER BY fts.rank
+                ORDER BY score
                 LIMIT ?
-            """, (safe_query, limit))
+            )
+            SELECT m.*, fts.score AS rank
+            FROM fts
+            JOIN memories m ON m.id = fts.rowid
+            {where}
+            ORDER BY fts.score
+            LIMIT ?
+        """, [safe_query, inner_limit] + params + [limit])
+        rows = _rows_as_dicts(cursor)
+
+        if filters and len(rows) < limit:
+            # Filtered matches ranked below the overfetch window were cut before
+            # the filters ran, so rank the filtered matches themselves
+            cursor.execute(f"""
+                SELECT m.*, bm25(memories_fts) AS rank
+                FROM memories_fts
+                JOIN memories m ON m.id = memories_fts.rowid
+                WHERE memories_fts MATCH ? AND {' AND '.join(filters)}
+                ORDER BY rank
+                LIMIT ?
+            """, [safe_query] + params + [limit])
+            rows = _rows_as_dicts(cursor)
 
-        return [dict(row) for row in cursor.fetchall()]
+        return rows
 
     def get_memories_by_type(self, memory_type: str, limit: int = 100) -> list[dict]:
         """Get memories by type."""
@@ -347,7 +681,14 @@ class MemoryDatabase:
             SELECT * FROM memories WHERE memory_type = ?
             ORDER BY importance DESC, created_at DESC LIMIT ?
         """, (memory_type, limit))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
+
+    def iter_memories_by_type(self, memory_type: str, limit: int = 100) -> Iterator[sqlite3.Row]:
+        """Stream memories by type as sqlite3.Row without building dicts."""
+        yield from self.conn.execute("""
+            SELECT * FROM memories WHERE memory_type = ?
+            ORDER BY importance DESC, created_at DESC LIMIT ?
+        """, (memory_type, limit))
 
     def get_memories_by_type_and_source(self, memory_type: str, source: str, limit: int = 100) -> list[dict]:
         """Get memories by type AND source/project at SQL level."""
@@ -358,7 +699,7 @@ class MemoryDatabase:
             ORDER BY importance DESC, created_at DESC
             LIMIT ?
         """, (memory_type, source, limit))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
 
     def get_memories_by_source(self, source: str, limit: int = 100) -> list[dict]:
         """Get memories by source/project."""
@@ -367,7 +708,52 @@ class MemoryDatabase:
             SELECT * FROM memories WHERE source = ?
             ORDER BY importance DESC, created_at DESC LIMIT ?
         """, (source, limit))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
+
+    def get_top_episodes_by_outcome(self, project_id: str, outcome: str, limit: int = 5) -> list[str]:
+        """Get the content of a project's highest-scoring episodes with an outcome.
+
+        Filters and orders on the outcome/score copied into metadata_json so
+        only the returned episodes need to be decoded by the caller.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT content FROM memories
+            WHERE memory_type = 'episode' AND source = ?
+              AND json_extract(metadata_json, '$.outcome') = ?
+            ORDER BY json_extract(metadata_json, '$.score') DESC, created_at DESC
+            LIMIT ?
+        """, (f"episode:{project_id}", outcome, limit))
+        return [row[0] for row in cursor]
+
+    def get_memories(self, memory_ids: list[str]) -> dict[str, dict]:
+        """Get several memories by ID, keyed by memory_id (missing IDs are absent)."""
+        ids = list(dict.fromkeys(memory_ids))
+        memories = {}
+        cursor = self.conn.cursor()
+        for start in range(0, len(ids), _MAX_IN_PARAMS):
+            chunk = ids[start:start + _MAX_IN_PARAMS]
+            cursor.execute(
+                f"SELECT * FROM memories WHERE memory_id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for row in _rows_as_dicts(cursor):
+                memories[row["memory_id"]] = row
+        return memories
+
+    def get_memories_by_types(self, memory_types: list[str], source: str = None,
+                              limit: int = 100) -> list[dict]:
+        """Get memories matching any of several types, optionally by source."""
+        params = list(memory_types)
+        where = f"memory_type IN ({', '.join('?' * len(memory_types))})"
+        if source:
+            where += " AND source = ?"
+            params.append(source)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT * FROM memories WHERE {where}
+            ORDER BY importance DESC, created_at DESC LIMIT ?
+        """, params + [limit])
+        return _rows_as_dicts(cursor)
 
     def get_all_memories(self, limit: int = 1000) -> list[dict]:
         """Get all memories."""
@@ -376,7 +762,35 @@ class MemoryDatabase:
             SELECT * FROM memories
             ORDER BY importance DESC, created_at DESC LIMIT ?
         """, (limit,))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
+
+    def get_memories_grouped(self, limit_per_type: int = 5, memory_type: str = None) -> list[dict]:
+        """Get the top memories of each type, ordered by type.
+
+        Each row also carries rn (rank within its type) and type_count
+        (total memories of that type).
+        """
+        where = "WHERE memory_type = ?" if memory_type else ""
+        params = ([memory_type] if memory_type else []) + [limit_per_type]
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT * FROM (
+                SELECT *,
+                       ROW_NUMBER() OVER (PARTITION BY memory_type
+                                          ORDER BY importance DESC, created_at DESC) AS rn,
+                       COUNT(*) OVER (PARTITION BY memory_type) AS type_count
+                FROM memories {where}
+            )
+            WHERE rn <= ?
+            ORDER BY memory_type, rn
+        """, params)
+        return _rows_as_dicts(cursor)
+
+    def count_memories(self) -> int:
+        """Count all memories."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM memories")
+        return cursor.fetchone()[0]
 
     # ===== Entity Operations =====
 
@@ -390,8 +804,9 @@ class MemoryDatabase:
                                 properties_json, created_at, updated_at)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (entity_id, entity_type, name, description,
-              json.dumps(properties) if properties else None, now, now))
-        self.conn.commit()
+              _dumps(properties) if properties else None, now, now))
+        self._entities_version += 1
+        self._commit()
         return cursor.lastrowid
 
     def get_entity(self, entity_id: str) -> dict | None:
@@ -401,11 +816,30 @@ class MemoryDatabase:
         row = cursor.fetchone()
         return dict(row) if row else None
 
-    def get_entities_by_type(self, entity_type: str) -> list[dict]:
+    def get_entities_by_type(self, entity_type: str, limit: int = None) -> list[dict]:
         """Get entities by type."""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM entities WHERE entity_type = ?", (entity_type,))
-        return [dict(row) for row in cursor.fetchall()]
+        if limit is None:
+            cursor.execute("SELECT * FROM entities WHERE entity_type = ?", (entity_type,))
+        else:
+            cursor.execute("SELECT * FROM entities WHERE entity_type = ? LIMIT ?", (entity_type, limit))
+        return _rows_as_dicts(cursor)
+
+    def get_entities_by_type_cached(self, entity_type: str, limit: int = None) -> list[dict]:
+        """Get entities by type, reusing the last result until an entity is written.
+
+        The returned list is shared between calls; do not mutate it.
+        """
+        key = (entity_type, limit, self._entities_version)
+        if self._entities_cache is None or self._entities_cache[0] != key:
+            self._entities_cache = (key, self.get_entities_by_type(entity_type, limit))
+        return self._entities_cache[1]
+
+    def count_entities_by_type(self, entity_type: str) -> int:
+        """Count entities of a type."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM entities WHERE entity_type = ?", (entity_type,))
+        return cursor.fetchone()[0]
 
     # ===== Edge Operations =====
 
@@ -419,21 +853,21 @@ class MemoryDatabase:
                              relationship_type, weight, properties_json, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (edge_id, source_entity_id, target_entity_id, relationship_type,
-              weight, json.dumps(properties) if properties else None, now))
-        self.conn.commit()
+              weight, _dumps(properties) if properties else None, now))
+        self._commit()
         return cursor.lastrowid
 
     def get_edges_from(self, entity_id: str) -> list[dict]:
         """Get edges from an entity."""
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM edges WHERE source_entity_id = ?", (entity_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
 
     def get_edges_to(self, entity_id: str) -> list[dict]:
         """Get edges to an entity."""
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM edges WHERE target_entity_id = ?", (entity_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
 
     def get_neighbors(self, entity_id: str) -> list[dict]:
         """Get all neighboring entities."""
@@ -443,13 +877,87 @@ class MemoryDatabase:
             FROM edges r
             JOIN entities e ON e.entity_id = r.target_entity_id
             WHERE r.source_entity_id = ?
-            UNION
+            UNION ALL
             SELECT e.*, r.relationship_type, r.weight
             FROM edges r
             JOIN entities e ON e.entity_id = r.source_entity_id
             WHERE r.target_entity_id = ?
         """, (entity_id, entity_id))
-        return [dict(row) for row in cursor.fetchall()]
+        # Self-loops and mirrored edges return identical rows from both
+        # halves; drop them here rather than paying for UNION's sort
+        cols = tuple(d[0] for d in cursor.description)
+        seen = set()
+        neighbors = []
+        for row in cursor:
+            key = tuple(row)
+            if key not in seen:
+                seen.add(key)
+                neighbors.append(dict(zip(cols, key)))
+        return neighbors
+
+    def get_neighbors_batch(self, entity_ids: list[str]) -> dict[str, list[dict]]:
+        """Get the neighbors of several entities with one query per chunk of IDs.
+
+        Returns a dict mapping each requested entity ID to the list
+        get_neighbors would return for it.
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        neighbors = {entity_id: [] for entity_id in ids}
+        seen = {entity_id: set() for entity_id in ids}
+        cursor = self.conn.cursor()
+        for start in range(0, len(ids), _MAX_IN_PARAMS):
+            chunk = ids[start:start + _MAX_IN_PARAMS]
+            marks = ", ".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT r.source_entity_id, e.*, r.relationship_type, r.weight
+                FROM edges r
+                JOIN entities e ON e.entity_id = r.target_entity_id
+                WHERE r.source_entity_id IN ({marks})
+                UNION ALL
+                SELECT r.target_entity_id, e.*, r.relationship_type, r.weight
+                FROM edges r
+                JOIN entities e ON e.entity_id = r.source_entity_id
+                WHERE r.target_entity_id IN ({marks})
+            """, chunk + chunk)
+            cols = tuple(d[0] for d in cursor.description[1:])
+            for row in cursor:
+                entity_id, key = row[0], tuple(row)[1:]
+                if key not in seen[entity_id]:
+                    seen[entity_id].add(key)
+                    neighbors[entity_id].append(dict(zip(cols, key)))
+        return neighbors
+
+    def get_neighbor_counts(self, entity_ids: list[str]) -> dict[str, int]:
+        """Count each entity's neighbors as len(get_neighbors(...)) would.
+
+        get_neighbors drops identical rows, and a neighbor row is determined
+        by (neighbor, relationship_type, weight), so UNION over those columns
+        counts the same rows. Entities without neighbors are absent.
+        """
+        ids = list(dict.fromkeys(entity_ids))
+        counts = {}
+        cursor = self.conn.cursor()
+        for start in range(0, len(ids), _MAX_IN_PARAMS):
+            chunk = ids[start:start + _MAX_IN_PARAMS]
+            marks = ", ".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT seed_id, COUNT(*) FROM (
+                    SELECT r.source_entity_id AS seed_id, r.target_entity_id,
+                           r.relationship_type, r.weight
+                    FROM edges r
+                    JOIN entities e ON e.entity_id = r.target_entity_id
+                    WHERE r.source_entity_id IN ({marks})
+                    UNION
+                    SELECT r.target_entity_id, r.source_entity_id,
+                           r.relationship_type, r.weight
+                    FROM edges r
+                    JOIN entities e ON e.entity_id = r.source_entity_id
+                    WHERE r.target_entity_id IN ({marks})
+                )
+                GROUP BY seed_id
+            """, chunk + chunk)
+            counts.update(cursor)
+        return counts
 
     # ===== Approval Operations =====
 
@@ -463,7 +971,7 @@ class MemoryDatabase:
                                 proposer, reason, created_at, updated_at, expires_at)
             VALUES (?, ?, ?, 'proposed', ?, ?, ?, ?, ?)
         """, (approval_id, target_type, target_id, proposer, reason, now, now, expires_at))
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def update_approval_status(self, approval_id: str, status: str,
@@ -481,7 +989,7 @@ class MemoryDatabase:
                 UPDATE approvals SET status = ?, updated_at = ?
                 WHERE approval_id = ?
             """, (status, now, approval_id))
-        self.conn.commit()
+        self._commit()
         return cursor.rowcount > 0
 
     def get_approval(self, approval_id: str) -> dict | None:
@@ -495,7 +1003,23 @@ class MemoryDatabase:
         """Get approvals by status."""
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM approvals WHERE status = ? ORDER BY created_at DESC", (status,))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
+
+    def count_approvals_by_status(self, statuses: list[str]) -> dict[str, int]:
+        """Count approvals for each of the given statuses in one query."""
+        counts = {status: 0 for status in statuses}
+        if not statuses:
+            return counts
+        cursor = self.conn.cursor()
+        placeholders = ", ".join("?" for _ in statuses)
+        cursor.execute(f"""
+            SELECT status, COUNT(*) FROM approvals
+            WHERE status IN ({placeholders})
+            GROUP BY status
+        """, statuses)
+        for status, count in cursor.fetchall():
+            counts[status] = count
+        return counts
 
     # ===== Trace Operations =====
 
@@ -509,50 +1033,50 @@ class MemoryDatabase:
                               start_time, input_json, metadata_json)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (trace_id, span_id, parent_span_id, operation_name, start_time,
-              json.dumps(input_data) if input_data else None,
-              json.dumps(metadata) if metadata else None))
-        self.conn.commit()
+              _dumps(input_data) if input_data else None,
+              _dumps(metadata) if metadata else None))
+        self._commit()
         return cursor.lastrowid
 
     def update_trace(self, span_id: str, end_time: str, status: str = "ok",
                     output_data: dict = None, error_message: str = None) -> bool:
-        """Update trace span with end time."""
-        cursor = self.conn.cursor()
-        # Calculate duration
-        cursor.execute("SELECT start_time FROM traces WHERE span_id = ?", (span_id,))
-        row = cursor.fetchone()
-        if not row:
-            return False
-
-        from datetime import datetime
-        start = datetime.fromisoformat(row[0])
-        end = datetime.fromisoformat(end_time)
-        duration_ms = (end - start).total_seconds() * 1000
+        """Update trace span with end time.
 
+        duration_ms is computed by SQLite from the stored start_time, so the
+        span is closed in a single UPDATE without re-reading or parsing it
+        (SQLite date functions resolve to the millisecond).
+        """
+        cursor = self.conn.cursor()
         cursor.execute("""
             UPDATE traces SET end_time = ?, status = ?, output_json = ?,
-                            error_message = ?, duration_ms = ?
+                            error_message = ?,
+                            duration_ms = ROUND((julianday(?) - julianday(start_time)) * 86400000.0, 3)
             WHERE span_id = ?
-        """, (end_time, status, json.dumps(output_data) if output_data else None,
-              error_message, duration_ms, span_id))
-        self.conn.commit()
+        """, (end_time, status, _dumps(output_data) if output_data else None,
+              error_message, end_time, span_id))
+        self._commit()
         return cursor.rowcount > 0
 
     def get_trace(self, trace_id: str) -> list[dict]:
         """Get all spans for a trace."""
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM traces WHERE trace_id = ? ORDER BY start_time", (trace_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
 
     def search_traces(self, query: str, limit: int = 100) -> list[dict]:
-        """Search traces."""
+        """Full-text search traces by operation name or error message."""
+        safe_query = fts_sanitize(query)
+        if not safe_query:
+            return []
+
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT * FROM traces
-            WHERE operation_name LIKE ? OR error_message LIKE ?
-            ORDER BY start_time DESC LIMIT ?
-        """, (f"%{query}%", f"%{query}%", limit))
-        return [dict(row) for row in cursor.fetchall()]
+            SELECT t.* FROM traces_fts f
+            JOIN traces t ON t.id = f.rowid
+            WHERE traces_fts MATCH ?
+            ORDER BY f.rank LIMIT ?
+        """, (safe_query, limit))
+        return _rows_as_dicts(cursor)
 
     # ===== Eval Operations =====
 
@@ -564,7 +1088,7 @@ class MemoryDatabase:
             INSERT INTO eval_runs (eval_id, eval_type, description, status, started_at)
             VALUES (?, ?, ?, 'running', ?)
         """, (eval_id, eval_type, description, now))
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def update_eval_run(self, eval_id: str, status: str, total: int = None,
@@ -586,18 +1110,18 @@ class MemoryDatabase:
             params.append(failed)
         if results is not None:
             updates.append("results_json = ?")
-            params.append(json.dumps(results))
+            params.append(_dumps(results))
         if metrics is not None:
             updates.append("metrics_json = ?")
-            params.append(json.dumps(metrics))
+            params.append(_dumps(metrics))
 
         if status in ("completed", "failed", "passed"):
             updates.append("completed_at = ?")
-            params.append(datetime.now(timezone.utc).isoformat())
+            params.append(self._now())
 
         params.append(eval_id)
         cursor.execute(f"UPDATE eval_runs SET {', '.join(updates)} WHERE eval_id = ?", params)
-        self.conn.commit()
+        self._commit()
         return cursor.rowcount > 0
 
     def get_eval_run(self, eval_id: str) -> dict | None:
@@ -611,18 +1135,71 @@ class MemoryDatabase:
         """Get all eval runs."""
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM eval_runs ORDER BY started_at DESC LIMIT ?", (limit,))
-        return [dict(row) for row in cursor.fetchall()]
+        return _rows_as_dicts(cursor)
+
+    # ===== Retrieval Cache =====
+
+    def get_cached_results(self, query_hash: bytes, max_age_sec: float = None) -> Any | None:
+        """Get cached results for a query hash, or None if missing or stale."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT results_json, created_at FROM retrieval_cache WHERE query_hash = ?",
+                       (query_hash,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if max_age_sec is not None and time.time() - row[1] > max_age_sec:
+            return None
+        return json.loads(row[0])
+
+    def put_cached_results(self, query_hash: bytes, results: Any, query: str = None,
+                           top_k: int = None, memory_type: str = None, source: str = None):
+        """Store results for a query hash."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO retrieval_cache (query_hash, query, top_k, memory_type,
+                                                  source, results_json, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (query_hash, query, top_k, memory_type, source,
+              _dumps(results), time.time()))
+        self._commit()
+
+    def clear_retrieval_cache(self):
+        """Drop all cached retrieval results."""
+        self.conn.execute("DELETE FROM retrieval_cache")
+        self._commit()
 
     # ===== Utility =====
 
     def vacuum(self):
         """Run VACUUM to optimize database."""
         self.conn.execute("VACUUM")
-        self.conn.commit()
+        self._commit()
+
+    def optimize(self):
+        """Merge FTS5 index segments and refresh query planner statistics.
+
+        The FTS sync triggers leave delete markers behind on every update and
+        delete; 'optimize' folds them into a single b-tree per index.
+        """
+        self.conn.execute("INSERT INTO memories_fts(memories_fts) VALUES ('optimize')")
+        self.conn.execute("INSERT INTO traces_fts(traces_fts) VALUES ('optimize')")
+        self._commit()
+        self.conn.execute("PRAGMA optimize")
 
     def close(self):
-        """Close database connection."""
-        self.conn.close()
+        """Close every connection opened by this database; closing again is a no-op."""
+        # Optimize through the caller's own connection only if it is still
+        # open, rather than opening one just for this
+        own = self._main_conn if self._shared else getattr(self._local, "conn", None)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        if own is not None and own in connections:
+            try:
+                own.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass  # Only a planner hint; closing must still go ahead
+        for conn in connections:
+            conn.close()
 
 
 def create_database(db_path: str | Path) -> MemoryDatabase:
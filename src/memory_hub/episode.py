@@ -16,14 +16,18 @@ An episode captures the outcome of an agent execution attempt, including:
 - Evidence (commands, artifacts, logs)
 """
 
+import io
 import json
 import re
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
 from typing import Any
 
 # English stopwords to filter during fingerprinting
-STOPWORDS = {
+STOPWORDS = frozenset({
     "a", "an", "the", "is", "are", "was", "were", "be", "been", "being",
     "have", "has", "had", "do", "does", "did", "will", "would", "could",
     "should", "may", "might", "must", "shall", "can", "need", "dare",
@@ -37,9 +41,11 @@ STOPWORDS = {
     "this", "that", "these", "those", "it", "its", "what", "which",
     "who", "whom", "whose", "add", "create", "fix", "update", "remove",
     "delete", "make", "get", "set", "put", "implement", "refactor"
-}
+})
 
-# Error signature penalties
+# Error signature penalties. calculate_score's substring fallback takes the
+# first pattern found, so this order decides the penalty of a free-form
+# signature that contains several patterns.
 ERROR_SIGNATURE_PENALTIES = {
     "false green": -20,
     "false_green": -20,
@@ -85,6 +91,24 @@ KNOWN_COMMAND_PATTERNS = {
     "bash", "pytest", "curl", "gh", "docker",
 }
 
+# Built once: json.dumps(..., ensure_ascii=False) constructs an encoder per call
+_EPISODE_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+# Sorted snapshots of the substring patterns scanned by extract_cues
+_SORTED_ENTITIES = tuple(sorted(KNOWN_ENTITIES))
+_SORTED_FILE_PATTERNS = tuple(sorted(KNOWN_FILE_PATTERNS))
+_ERROR_VARIANTS = tuple((sig, sig.replace(" ", "_")) for sig in sorted(ERROR_SIGNATURE_PENALTIES))
+
+# Patterns compiled once at import for the cue/fingerprint hot paths
+_SH_RE = re.compile(r'\b\w+\.sh\b')
+# Word runs of 2+ characters: punctuation and whitespace both separate tokens
+_FINGERPRINT_TOKEN_RE = re.compile(r"\w{2,}")
+# Longest alternatives first so a shorter command never shadows a longer
+# one sharing its prefix; sorting also keeps the compiled pattern stable
+_TOOL_RE = re.compile(r'\b(?:' + '|'.join(
+    re.escape(c) for c in sorted(KNOWN_COMMAND_PATTERNS, key=lambda c: (-len(c), c))
+) + r')\b')
+
 
 def extract_cues(prompt: str, evidence: str = "") -> dict:
     """
@@ -99,45 +123,60 @@ def extract_cues(prompt: str, evidence: str = "") -> dict:
     """
     combined = f"{prompt} {evidence}".lower()
 
-    entities = []
-    for entity in KNOWN_ENTITIES:
-        if entity in combined:
-            entities.append(entity)
+    # Known patterns are pre-sorted, so matches come out in sorted order
+    entities = [entity for entity in _SORTED_ENTITIES if entity in combined]
 
     # Extract file patterns (*.sh, handler.ts, etc.)
-    files = []
-    for pattern in KNOWN_FILE_PATTERNS:
-        if pattern in combined:
-            files.append(pattern)
-    # Also match *.sh pattern
-    sh_matches = re.findall(r'\b\w+\.sh\b', combined)
-    for sh in sh_matches:
-        if sh not in files:
-            files.append(sh)
-
-    # Extract error signatures
-    errors = []
-    for sig in ERROR_SIGNATURE_PENALTIES.keys():
-        if sig.replace(" ", " ") in combined or sig.replace(" ", "_") in combined:
-            if sig not in errors:
-                errors.append(sig)
-
-    # Extract command patterns
-    tools = []
-    for cmd in KNOWN_COMMAND_PATTERNS:
-        # Match command at start of word
-        if re.search(rf'\b{re.escape(cmd)}\b', combined):
-            if cmd not in tools:
-                tools.append(cmd)
+    files = [pattern for pattern in _SORTED_FILE_PATTERNS if pattern in combined]
+    # Also match *.sh pattern (deduplicated with the rest on return)
+    files.extend(_SH_RE.findall(combined))
+
+    # Extract error signatures (spaced or underscored spelling)
+    errors = [
+        sig for sig, underscored in _ERROR_VARIANTS
+        if sig in combined or (underscored != sig and underscored in combined)
+    ]
+
+    # Extract command patterns (whole-word matches, one pass over the text)
+    tools = _TOOL_RE.findall(combined)
 
     return {
-        "entities": sorted(set(entities)),
+        "entities": entities,
         "files": sorted(set(files)),
-        "error_signatures": sorted(errors),
+        "error_signatures": errors,
         "tools": sorted(set(tools)),
     }
 
 
+def _first_pattern_penalty(sig_lower: str) -> int:
+    """Penalty of the first table pattern found in a signature, 0 if none."""
+    for pattern, penalty in ERROR_SIGNATURE_PENALTIES.items():
+        if pattern in sig_lower:
+            return penalty
+    return 0
+
+
+# Signatures from extract_cues are table keys, so their penalty is looked up
+# directly. It is what the scan gives them, which is not always their own
+# entry: 'gateway timeout' contains the earlier 'timeout'.
+_KEY_PENALTIES = {sig: _first_pattern_penalty(sig) for sig in ERROR_SIGNATURE_PENALTIES}
+
+
+def _signature_penalty(sig_lower: str) -> int:
+    """Penalty of the first table pattern found in a signature, 0 if none (not cached; _scored is)."""
+    penalty = _KEY_PENALTIES.get(sig_lower)
+    if penalty is not None:
+        return penalty
+    return _first_pattern_penalty(sig_lower)
+
+
+@lru_cache(maxsize=2048)
+def _fingerprint_tail(tokens: frozenset[str]) -> str:
+    """Sorted '+'-joined token set; rewordings with the same tokens share it."""
+    return "+".join(sorted(tokens))
+
+
+@lru_cache(maxsize=4096)
 def intent_fingerprint(prompt: str, project_id: str) -> str:
     """
     Generate a robust fingerprint for an intent, normalized to be
@@ -153,32 +192,27 @@ def intent_fingerprint(prompt: str, project_id: str) -> str:
     # Normalize: lowercase
     normalized = prompt.lower()
 
-    # Remove punctuation
-    normalized = re.sub(r"[^\w\s]", " ", normalized)
-
-    # Extract tokens (alphanumeric)
-    tokens = normalized.split()
-
-    # Filter stopwords and short tokens
-    tokens = [t for t in tokens if t not in STOPWORDS and len(t) > 1]
-
-    # Deduplicate while preserving order
-    seen = set()
-    unique_tokens = []
-    for t in tokens:
-        if t not in seen:
-            seen.add(t)
-            unique_tokens.append(t)
-
-    # Take top 10 stable tokens
-    stable_tokens = unique_tokens[:10]
+    # Take the first 10 unique tokens, skipping stopwords; the tokenizer
+    # already splits on punctuation and drops single-character tokens
+    stable_tokens = {}
+    for t in _FINGERPRINT_TOKEN_RE.findall(normalized):
+        if t in STOPWORDS:
+            continue
+        stable_tokens[t] = None
+        if len(stable_tokens) == 10:
+            break
 
     # Generate fingerprint
-    fingerprint = f"{project_id}::{'+'.join(sorted(stable_tokens))}"
+    fingerprint = f"{project_id}::{_fingerprint_tail(frozenset(stable_tokens))}"
 
     return fingerprint
 
 
+# Per-outcome base score and initial strength for calculate_score
+_OUTCOME_BASES = {"success": 85, "mixed": 60, "failure": 25}
+_OUTCOME_STRENGTHS = {"success": 0.5, "mixed": 0.6, "failure": 0.7}
+
+
 def calculate_score(
     outcome: str,
     attempts: int,
@@ -201,13 +235,22 @@ def calculate_score(
     Returns:
         dict with keys: score (0-100), valence (-1 to 1), strength (0-1)
     """
-    # Base score by outcome
-    outcome_bases = {
-        "success": 85,
-        "mixed": 60,
-        "failure": 25
+    score, valence, strength = _scored(
+        outcome, attempts, rollbacks, tuple(error_signatures), has_regression_test, has_release
+    )
+    return {
+        "score": score,
+        "valence": valence,
+        "strength": strength
     }
-    score = outcome_bases.get(outcome, 50)
+
+
+@lru_cache(maxsize=4096)
+def _scored(outcome: str, attempts: int, rollbacks: int, error_signatures: tuple[str, ...],
+            has_regression_test: bool, has_release: bool) -> tuple[int, float, float]:
+    """(score, valence, strength) for calculate_score; a pure function of its inputs, so cached."""
+    # Base score by outcome
+    score = _OUTCOME_BASES.get(outcome, 50)
 
     # Penalty for attempts > 1
     if attempts > 1:
@@ -216,13 +259,9 @@ def calculate_score(
     # Penalty for rollbacks
     score -= rollbacks * 10
 
-    # Penalty for error signatures
+    # Penalty for error signatures (a tuple, so repeated signatures still count)
     for sig in error_signatures:
-        sig_lower = sig.lower()
-        for pattern, penalty in ERROR_SIGNATURE_PENALTIES.items():
-            if pattern in sig_lower:
-                score += penalty
-                break
+        score += _signature_penalty(sig.lower())
 
     # Bonuses
     if has_regression_test:
@@ -231,30 +270,24 @@ def calculate_score(
         score += 5
 
     # Clamp to 0-100
-    score = max(0, min(100, score))
+    score = 0 if score < 0 else 100 if score > 100 else score
 
-    # Valence: clip((score-50)/50, -1, 1)
+    # Valence: (score-50)/50, already within -1..1 since score is clamped
     valence = (score - 50) / 50
-    valence = max(-1.0, min(1.0, valence))
 
-    # Strength: initial based on outcome
-    if outcome == "success":
-        strength = 0.5
-    elif outcome == "failure":
-        strength = 0.7
-    else:  # mixed
-        strength = 0.6
+    # Strength: initial based on outcome (anything else scores as mixed)
+    strength = _OUTCOME_STRENGTHS.get(outcome, 0.6)
 
-    return {
-        "score": score,
-        "valence": valence,
-        "strength": strength
-    }
+    return score, valence, strength
 
 
 # In-memory store for used episodes (reset on restart - V1)
-# Maps fingerprint -> list of episode_ids that were used/injected
-_USED_EPISODES: dict[str, list[str]] = {}
+# Maps fingerprint -> episode_ids that were used/injected (an insertion-ordered
+# dict used as a set), least recently used fingerprint first
+_USED_EPISODES: OrderedDict[str, dict[str, None]] = OrderedDict()
+
+# Fingerprints tracked before the least recently used one is dropped
+MAX_USED_FINGERPRINTS = 10000
 
 
 def mark_episode_used(fingerprint: str, episode_id: str) -> None:
@@ -265,10 +298,14 @@ def mark_episode_used(fingerprint: str, episode_id: str) -> None:
         fingerprint: The intent fingerprint
         episode_id: The episode ID that was used
     """
-    if fingerprint not in _USED_EPISODES:
-        _USED_EPISODES[fingerprint] = []
-    if episode_id not in _USED_EPISODES[fingerprint]:
-        _USED_EPISODES[fingerprint].append(episode_id)
+    used = _USED_EPISODES.get(fingerprint)
+    if used is None:
+        used = _USED_EPISODES[fingerprint] = {}
+        if len(_USED_EPISODES) > MAX_USED_FINGERPRINTS:
+            _USED_EPISODES.popitem(last=False)
+    else:
+        _USED_EPISODES.move_to_end(fingerprint)
+    used[episode_id] = None
 
 
 def bump_episode_strength(
@@ -294,111 +331,130 @@ def bump_episode_strength(
     Returns:
         List of episode IDs whose strength was bumped
     """
-    bumped = []
-    used_ids = _USED_EPISODES.get(fingerprint, [])
+    used_ids = _USED_EPISODES.get(fingerprint, {})
 
     # Take only the most recent N used IDs (deterministic: first N from list)
-    ids_to_bump = used_ids[:limit]
+    ids_to_bump = list(islice(used_ids, limit))
 
-    for episode_id in ids_to_bump:
-        # Get the episode from db
-        mem = db.get_memory(episode_id)
-        if mem:
-            try:
-                episode = json.loads(mem["content"])
-                old_strength = episode.get("strength", 0.5)
-                # Bump by specified amount, capped at cap
-                new_strength = min(cap, old_strength + bump)
-                episode["strength"] = new_strength
-                # Update in db
-                db.update_memory(episode_id, json.dumps(episode))
-                bumped.append(episode_id)
-            except (json.JSONDecodeError, KeyError):
-                continue
-
-    return bumped
+    # Bump by specified amount, capped at cap, in one UPDATE
+    return db.bump_episode_strengths(ids_to_bump, bump, cap=cap)
 
 
 def get_used_episodes(fingerprint: str) -> list[str]:
     """Get list of episode IDs used for a fingerprint."""
-    return _USED_EPISODES.get(fingerprint, [])
+    return list(_USED_EPISODES.get(fingerprint, ()))
 
 
-def store_episode(episode: dict, db, events) -> str:
+def _episode_records(episode: dict) -> tuple[tuple, dict]:
     """
-    Store an episode as a memory.
-
-    Args:
-        episode: Episode dict with all required fields
-        db: MemoryDatabase instance
-        events: EventStore instance
+    Build the event record and memory row for an episode.
 
     Returns:
-        The memory_id of the stored episode
+        Tuple of ((event_type, payload, metadata), insert_memory kwargs)
     """
-    from pathlib import Path
-
     episode_id = episode.get("episode_id", str(uuid.uuid4()))
     project_id = episode.get("project_id", "unknown")
     fingerprint = episode.get("intent_fingerprint", "")
     outcome = episode.get("outcome", "mixed")
 
     # Serialize episode content as JSON
-    content = json.dumps(episode, ensure_ascii=False)
+    content = _EPISODE_ENCODER.encode(episode)
 
-    # Build keys for indexing
+    # Build keys for indexing, followed by one key per cue (a cue list may be
+    # missing or null)
+    cues = episode.get("cues") or {}
+    entities, errors, tools, files = (
+        cues.get(name) or () for name in ("entities", "error_signatures", "tools", "files")
+    )
     keys = [
         "episode",
         f"intent:{fingerprint}",
         f"project:{project_id}",
         f"outcome:{outcome}",
+        *[f"entity:{entity}" for entity in entities],
+        *[f"error:{error}" for error in errors],
+        *[f"tool:{tool}" for tool in tools],
+        *[f"file:{file}" for file in files],
     ]
 
-    # Add cue keys
-    cues = episode.get("cues", {})
-    for entity in cues.get("entities", []):
-        keys.append(f"entity:{entity}")
-    for error in cues.get("error_signatures", []):
-        keys.append(f"error:{error}")
-    for tool in cues.get("tools", []):
-        keys.append(f"tool:{tool}")
-    for file in cues.get("files", []):
-        keys.append(f"file:{file}")
-
     # Importance based on score
-    importance = episode.get("score", 50) / 100.0
+    score = episode.get("score")
+    importance = (50 if score is None else score) / 100.0
 
     # Source: episode:<project_id>
     source = f"episode:{project_id}"
 
-    # Record event
-    event_id = events.append("episode_stored", {
+    event = ("episode_stored", {
         "episode_id": episode_id,
         "project_id": project_id,
         "outcome": outcome,
-        "score": episode.get("score"),
-    }, metadata={
+        "score": score,
+    }, {
         "intent_fingerprint": fingerprint,
     })
 
-    # Store in database
-    memory_id = db.insert_memory(
-        memory_id=episode_id,
-        content=content,
-        memory_type="episode",
-        source=source,
-        importance=importance,
-        metadata={
+    memory = {
+        "memory_id": episode_id,
+        "content": content,
+        "memory_type": "episode",
+        "source": source,
+        "importance": importance,
+        "metadata": {
             "keys": keys,
             "intent_fingerprint": fingerprint,
             "project_id": project_id,
             "outcome": outcome,
-            "score": episode.get("score"),
+            "score": score,
         },
-        event_id=event_id
-    )
+    }
+
+    return event, memory
+
+
+def store_episode(episode: dict, db, events) -> str:
+    """
+    Store an episode as a memory.
+
+    Args:
+        episode: Episode dict with all required fields
+        db: MemoryDatabase instance
+        events: EventStore instance
+
+    Returns:
+        The memory_id of the stored episode
+    """
+    event, memory = _episode_records(episode)
+
+    # Record event
+    event_id = events.append(*event)
+
+    # Store in database
+    db.insert_memory(**memory, event_id=event_id)
+
+    return memory["memory_id"]
+
+
+def store_episodes(episodes: list[dict], db, events) -> list[str]:
+    """
+    Store many episodes with one event-store write and one DB transaction.
+
+    Args:
+        episodes: Episode dicts with all required fields
+        db: MemoryDatabase instance
+        events: EventStore instance
 
-    return episode_id
+    Returns:
+        The memory_ids of the stored episodes, in input order
+    """
+    records = [_episode_records(episode) for episode in episodes]
+    if not records:
+        return []
+
+    event_ids = events.append_many([event for event, _ in records])
+    memories = [dict(memory, event_id=event_id) for (_, memory), event_id in zip(records, event_ids)]
+    db.insert_memories(memories)
+
+    return [memory["memory_id"] for memory in memories]
 
 
 def retrieve_episodes(project_id: str, prompt: str, top_k: int, db) -> list[dict]:
@@ -417,21 +473,19 @@ def retrieve_episodes(project_id: str, prompt: str, top_k: int, db) -> list[dict
     # Generate fingerprint from prompt
     fingerprint = intent_fingerprint(prompt, project_id)
 
-    # Get all episode memories for this project
+    # Get the project's top episodes: their importance is score / 100, so the
+    # SQL importance order already ranks by score and only top_k rows are decoded
     episodes = db.get_memories_by_type_and_source(
         memory_type="episode",
         source=f"episode:{project_id}",
-        limit=top_k * 2  # Get more to filter
+        limit=top_k
     )
 
-    # Parse and filter by fingerprint similarity
+    # Parse episodes (the source filter already scopes them to the project)
     results = []
     for mem in episodes:
         try:
-            episode = json.loads(mem["content"])
-            # Include if same project and similar intent
-            if episode.get("project_id") == project_id:
-                results.append(episode)
+            results.append(json.loads(mem["content"]))
         except json.JSONDecodeError:
             continue
 
@@ -463,95 +517,74 @@ def assemble_episodes_context(
     Returns:
         Tuple of (markdown string, list of included episode IDs)
     """
-    # Get all episode memories for this project
-    all_episodes = db.get_memories_by_type_and_source(
-        memory_type="episode",
-        source=f"episode:{project_id}",
-        limit=top_k * 4
-    )
-
-    # Parse episodes
-    episodes = []
-    for mem in all_episodes:
-        try:
-            episode = json.loads(mem["content"])
-            if episode.get("project_id") == project_id:
-                episodes.append(episode)
-        except json.JSONDecodeError:
-            continue
-
-    # Separate by outcome
-    successes = [e for e in episodes if e.get("outcome") == "success"]
-    failures = [e for e in episodes if e.get("outcome") == "failure"]
+    # Top episodes per outcome, filtered and ordered by score in SQL
+    def top_episodes(outcome: str) -> list[dict]:
+        episodes = []
+        for content in db.get_top_episodes_by_outcome(project_id, outcome, limit=top_k):
+            try:
+                episodes.append(json.loads(content))
+            except json.JSONDecodeError:
+                continue
+        return episodes
 
-    # Sort by score
-    successes.sort(key=lambda e: e.get("score", 0), reverse=True)
-    failures.sort(key=lambda e: e.get("score", 0), reverse=True)
+    successes = top_episodes("success")
+    failures = top_episodes("failure")
 
-    # Take top_k
-    successes = successes[:top_k]
-    failures = failures[:top_k]
+    if not successes and not failures:
+        return ("No episode history found for this project.", [])
 
-    lines = []
+    # Each line is written with its trailing newline; the final one is
+    # trimmed on return
+    buf = io.StringIO()
+    w = buf.write
 
     # Best Known Path (successes)
     if successes:
-        lines.append("## Best Known Path")
-        lines.append("")
+        w("## Best Known Path\n\n")
         for i, ep in enumerate(successes, 1):
-            score = ep.get("score", 0)
-            intent = ep.get("intent", "")[:100]
             path = ep.get("path", [])
             cues = ep.get("cues", {})
+            attempts = ep.get("cost", {}).get("attempts", 1)
 
-            lines.append(f"### {i}. {intent}")
-            lines.append(f"**Score:** {score} | **Attempts:** {ep.get('cost', {}).get('attempts', 1)}")
-            lines.append("")
+            w(f"### {i}. {ep.get('intent', '')[:100]}\n"
+              f"**Score:** {ep.get('score', 0)} | **Attempts:** {attempts}\n\n")
 
             if path:
-                lines.append("**Path:**")
-                for step in path[:5]:  # Limit steps
-                    lines.append(f"- {step}")
-                lines.append("")
+                w("**Path:**\n")
+                w("".join(f"- {step}\n" for step in path[:5]))  # Limit steps
+                w("\n")
 
-            if cues.get("tools"):
-                lines.append(f"**Tools:** {', '.join(cues.get('tools', [])[:5])}")
-            if cues.get("files"):
-                lines.append(f"**Files:** {', '.join(cues.get('files', [])[:5])}")
+            tools = cues.get("tools")
+            if tools:
+                w(f"**Tools:** {', '.join(tools[:5])}\n")
+            files = cues.get("files")
+            if files:
+                w(f"**Files:** {', '.join(files[:5])}\n")
 
-            lines.append("")
+            w("\n")
 
     # Pitfalls to Avoid (failures)
     if failures:
-        lines.append("## Pitfalls to Avoid")
-        lines.append("")
+        w("## Pitfalls to Avoid\n\n")
         for i, ep in enumerate(failures, 1):
-            score = ep.get("score", 0)
-            intent = ep.get("intent", "")[:100]
             errors = ep.get("cues", {}).get("error_signatures", [])
 
-            lines.append(f"### {i}. {intent}")
-            lines.append(f"**Score:** {score}")
-            lines.append("")
+            w(f"### {i}. {ep.get('intent', '')[:100]}\n"
+              f"**Score:** {ep.get('score', 0)}\n\n")
 
             if errors:
-                lines.append(f"**Errors:** {', '.join(errors[:3])}")
-                lines.append("")
+                w(f"**Errors:** {', '.join(errors[:3])}\n\n")
 
             path = ep.get("path", [])
             if path:
-                lines.append("**What went wrong:**")
-                for step in path[:3]:
-                    lines.append(f"- {step}")
-                lines.append("")
+                w("**What went wrong:**\n")
+                w("".join(f"- {step}\n" for step in path[:3]))
+                w("\n")
 
     # Collect included episode IDs (final selection)
     included_ids = [ep.get("episode_id") for ep in successes + failures if ep.get("episode_id")]
 
-    if not lines:
-        return ("No episode history found for this project.", [])
-
-    return ("\n".join(lines), included_ids)
+    return (buf.getvalue()[:-1], included_ids)
 
 
 def create_episode(
@@ -567,6 +600,7 @@ def create_episode(
     evidence: dict | None = None,
     has_regression_test: bool = False,
     has_release: bool = False,
+    now: str | None = None,
 ) -> dict:
     """
     Create a complete episode dict with scoring.
@@ -584,11 +618,13 @@ def create_episode(
         evidence: Dict with commands, artifacts, commit, logs
         has_regression_test: Whether regression test was added
         has_release: Whether this was released
+        now: ISO timestamp for created_at/updated_at (current time if None)
 
     Returns:
         Complete episode dict
     """
-    now = datetime.now(timezone.utc).isoformat()
+    if now is None:
+        now = datetime.now(timezone.utc).isoformat()
 
     # Generate fingerprint
     fingerprint = intent_fingerprint(intent, project_id)
@@ -635,3 +671,19 @@ def create_episode(
     }
 
     return episode
+
+
+def create_episodes(specs: list[dict], now: str | None = None) -> list[dict]:
+    """
+    Create many episodes sharing one timestamp.
+
+    Args:
+        specs: Dicts of create_episode keyword arguments
+        now: ISO timestamp for every episode (read once if None)
+
+    Returns:
+        Complete episode dicts, in input order
+    """
+    if now is None:
+        now = datetime.now(timezone.utc).isoformat()
+    return [create_episode(**spec, now=now) for spec in specs]
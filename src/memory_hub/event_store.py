@@ -7,13 +7,51 @@ Append-only JSONL event store as the truth source for Memory Fabric.
 Events are immutable and form the foundation of the event sourcing architecture.
 """
 
+import io
 import json
 import os
-import uuid
+import shutil
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Iterator
 
+# Shared compact encoder for JSONL lines (no padding after separators)
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# Reused codecs: json.dumps with non-default options builds a new encoder
+# per call, and json.loads adds argument handling around decode()
+_PAYLOAD_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_decode = json.JSONDecoder().decode
+
+# Event IDs are canonical UUID4 strings built from a pool of random 128-bit
+# ints, so appends share one os.urandom call per _ID_POOL_SIZE IDs instead of
+# one call and a uuid.UUID construction each
+_ID_POOL_SIZE = 256
+_UUID4_MASK = ~((0xF000 << 64) | (0xC000 << 48)) & ((1 << 128) - 1)
+_UUID4_BITS = (0x4000 << 64) | (0x8000 << 48)  # version 4, RFC 4122 variant
+_id_pool: list[int] = []
+if hasattr(os, "register_at_fork"):
+    # A forked child must not hand out the IDs its parent still holds
+    os.register_at_fork(after_in_child=_id_pool.clear)
+
+
+def _new_uuid4() -> str:
+    # pop() is atomic, so another thread emptying the pool between a check
+    # and the pop cannot happen; a concurrent refill only adds fresh IDs
+    while True:
+        try:
+            value = _id_pool.pop()
+            break
+        except IndexError:
+            raw = os.urandom(16 * _ID_POOL_SIZE)
+            _id_pool.extend(int.from_bytes(raw[i:i + 16], "big") for i in range(0, len(raw), 16))
+    h = f"{value & _UUID4_MASK | _UUID4_BITS:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+# Characters that JSON puts between tokens (plus the separator padding)
+_JSON_PUNCTUATION = frozenset('{}[]:,"')
+
 
 class EventStore:
     """
@@ -22,15 +60,33 @@ class EventStore:
     Events are the single source of truth. All state is derived from events.
     """
 
-    def __init__(self, data_dir: Path):
+    # Batched mode writes buffered events out once this many are pending
+    MAX_PENDING = 256
+
+    def __init__(self, data_dir: Path, batched: bool = False):
+        """
+        Open an event store.
+
+        Args:
+            data_dir: Directory holding events.jsonl
+            batched: If True, append() buffers events in memory until flush()
+                or until MAX_PENDING events are waiting
+        """
         self.data_dir = Path(data_dir)
         self.events_file = self.data_dir / "events.jsonl"
-        self.data_dir.mkdir(parents=True, exist_ok=True)
         if not self.events_file.exists():
+            self.data_dir.mkdir(parents=True, exist_ok=True)
             self.events_file.touch()
+        self.batched = batched
+        self._pending: list[dict[str, Any]] = []
+        # Unbuffered append handle, opened on first write and kept for the
+        # store's lifetime so each append is a single write(2)
+        self._file: io.FileIO | None = None
+        # (byte offset, events before it) from the last count()
+        self._count_cache = (0, 0)
 
     def _generate_event_id(self) -> str:
-        return str(uuid.uuid4())
+        return _new_uuid4()
 
     def _timestamp(self) -> str:
         return datetime.now(timezone.utc).isoformat()
@@ -47,7 +103,41 @@ class EventStore:
         Returns:
             Event ID
         """
-        event = {
+        event = self._make_event(event_type, payload, metadata)
+
+        if self.batched:
+            self._pending.append(event)
+            if len(self._pending) >= self.MAX_PENDING:
+                self.flush()
+        else:
+            self._write([event])
+
+        return event["event_id"]
+
+    def append_many(self, records: list[tuple]) -> list[str]:
+        """
+        Append several events with a single write and fsync.
+
+        Args:
+            records: (event_type, payload) or (event_type, payload, metadata) tuples
+
+        Returns:
+            Event IDs in input order
+        """
+        events = [self._make_event(*record) for record in records]
+        self._write(events, sync=True)
+        return [event["event_id"] for event in events]
+
+    def flush(self):
+        """Write out events buffered in batched mode."""
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        self._write(events, sync=True)
+
+    def _make_event(self, event_type: str, payload: dict[str, Any],
+                    metadata: dict[str, Any] | None = None) -> dict[str, Any]:
+        return {
             "event_id": self._generate_event_id(),
             "timestamp": self._timestamp(),
             "event_type": event_type,
@@ -55,17 +145,38 @@ class EventStore:
             "metadata": metadata or {}
         }
 
-        with open(self.events_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    def _write(self, events: list[dict[str, Any]], sync: bool = False):
+        """Serialize events into one buffer and append it to the file."""
+        encode = _ENCODER.encode
+        data = memoryview("".join([encode(event) + "\n" for event in events]).encode("utf-8"))
+        if self._file is None:
+            self._file = io.FileIO(self.events_file, "a")
+        while data:
+            data = data[self._file.write(data):]
+        if sync:
+            os.fsync(self._file.fileno())
 
-        return event["event_id"]
+    def close(self):
+        """Flush buffered events and release the append handle."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __del__(self):
+        # Release the append handle of a store that was never closed; pending
+        # batched events are only written by an explicit flush() or close()
+        file = getattr(self, "_file", None)
+        if file is not None:
+            file.close()
 
     def read_all(self) -> Iterator[dict[str, Any]]:
         """Read all events in chronological order."""
+        self.flush()
         with open(self.events_file, "r", encoding="utf-8") as f:
             for line in f:
                 if line.strip():
-                    yield json.loads(line)
+                    yield _decode(line)
 
     def read_from(self, start_timestamp: str) -> Iterator[dict[str, Any]]:
         """Read events from a specific timestamp onwards."""
@@ -73,41 +184,96 @@ class EventStore:
             if event["timestamp"] >= start_timestamp:
                 yield event
 
+    def _read_containing(self, value: Any) -> Iterator[dict[str, Any]]:
+        """
+        Read events whose line could hold the given string value.
+
+        An event holding the value contains its JSON encoding verbatim, so
+        lines without it are skipped before decoding. Callers still compare
+        the decoded field, since the text may appear elsewhere in the line.
+        """
+        if not isinstance(value, str):
+            yield from self.read_all()
+            return
+        needle = _PAYLOAD_ENCODER.encode(value)
+        self.flush()
+        with open(self.events_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if needle in line:
+                    yield _decode(line)
+
     def get_by_type(self, event_type: str) -> Iterator[dict[str, Any]]:
         """Get all events of a specific type."""
-        for event in self.read_all():
+        for event in self._read_containing(event_type):
             if event["event_type"] == event_type:
                 yield event
 
     def get_by_correlation(self, correlation_id: str) -> Iterator[dict[str, Any]]:
         """Get all events with a specific correlation ID."""
-        for event in self.read_all():
+        for event in self._read_containing(correlation_id):
             if event.get("metadata", {}).get("correlation_id") == correlation_id:
                 yield event
 
     def count(self) -> int:
         """Count total events."""
-        with open(self.events_file, "r", encoding="utf-8") as f:
-            return sum(1 for line in f if line.strip())
+        self.flush()
+        # The log only grows, so lines counted before are not read again:
+        # scanning resumes at the end of the last complete line seen. A
+        # shorter file means it was replaced, and counting starts over.
+        offset, counted = self._count_cache
+        if self.events_file.stat().st_size < offset:
+            offset, counted = 0, 0
+        partial = 0
+        # Binary mode: counting lines does not need them decoded from UTF-8
+        with open(self.events_file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Unterminated last line: count it but rescan it next time
+                    partial = 1 if line.strip() else 0
+                    break
+                offset += len(line)
+                if line.strip():
+                    counted += 1
+        self._count_cache = (offset, counted)
+        return counted + partial
 
     def search(self, query: str) -> list[dict[str, Any]]:
         """Search events by content (simple substring match in payload)."""
         results = []
         query_lower = query.lower()
-        for event in self.read_all():
-            payload_str = json.dumps(event.get("payload", {}), ensure_ascii=False).lower()
-            if query_lower in payload_str:
-                results.append(event)
+        encode = _PAYLOAD_ENCODER.encode
+        # Without JSON punctuation or a leading space the query can only match
+        # inside one encoded token, which the stored line spells the same way,
+        # so lines that lack it are skipped before decoding
+        prefilter = not (_JSON_PUNCTUATION & set(query_lower)) and not query_lower[:1].isspace()
+        self.flush()
+        with open(self.events_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if prefilter and query_lower not in line.lower():
+                    continue
+                if not line.strip():
+                    continue
+                event = _decode(line)
+                payload_str = encode(event.get("payload", {})).lower()
+                if query_lower in payload_str:
+                    results.append(event)
         return results
 
     def export(self, output_file: Path, redact: bool = False):
         """Export all events to a file."""
-        with open(output_file, "w", encoding="utf-8") as out:
+        if not redact:
+            # Plain export is a byte copy of the log; shutil.copyfile uses
+            # sendfile(2) on Linux so the data never enters Python.
+            self.flush()
+            shutil.copyfile(self.events_file, output_file)
+            return
+
+        with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as out:
             for event in self.read_all():
-                if redact:
-                    # Redact sensitive fields
-                    event = self._redact_event(event)
-                out.write(json.dumps(event, ensure_ascii=False) + "\n")
+                # Redact sensitive fields
+                event = self._redact_event(event)
+                out.write(_ENCODER.encode(event) + "\n")
 
     def _redact_event(self, event: dict) -> dict:
         """Redact sensitive information from event."""
@@ -121,6 +287,6 @@ class EventStore:
 
 
 # Convenience functions
-def create_event_store(data_dir: str | Path) -> EventStore:
+def create_event_store(data_dir: str | Path, batched: bool = False) -> EventStore:
     """Create or open an event store."""
-    return EventStore(Path(data_dir))
+    return EventStore(Path(data_dir), batched=batched)
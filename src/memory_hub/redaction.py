@@ -7,20 +7,27 @@ No LLM - pure regex-based pattern matching.
 """
 
 import re
-from typing import Optional
+import string
+from functools import partial
+from typing import Iterator, Optional
+
+# Emails (redact and contains_secrets match this one with _email_spans)
+_EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
 
 
 # Common secret patterns
+# Patterns run in order, each over the previous one's output, so where they
+# overlap the longer variant comes first.
 PATTERNS = [
+    # Anthropic
+    (r'sk-ant-[a-zA-Z0-9\-_]+', '<REDACTED_TOKEN>'),
+
     # API keys (various services)
     (r'sk-[a-zA-Z0-9]{20,}', '<REDACTED_TOKEN>'),
     (r'sk-[a-zA-Z0-9]+', '<REDACTED_TOKEN>'),  # Any sk- key
     (r'Bearer\s+[a-zA-Z0-9\-_]+\.[a-zA-Z0-9\-_]+\.[a-zA-Z0-9\-_]+', '<REDACTED_TOKEN>'),
     (r'Bearer\s+[a-zA-Z0-9\-_]+', '<REDACTED_TOKEN>'),
 
-    # Anthropic
-    (r'sk-ant-[a-zA-Z0-9\-_]+', '<REDACTED_TOKEN>'),
-
     # OpenAI
     (r'OpenAI\s+[a-zA-Z0-9\-_]+', '<REDACTED_TOKEN>'),
 
@@ -34,7 +41,7 @@ PATTERNS = [
     (r'(?i)(api[_-]?key|secret[_-]?key|access[_-]?token|auth[_-]?token)\s*[:=]\s*[\'"]?[a-zA-Z0-9\-_]{16,}[\'"]?', '<REDACTED_SECRET>'),
 
     # Emails
-    (r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', '<REDACTED_EMAIL>'),
+    (_EMAIL_PATTERN, '<REDACTED_EMAIL>'),
 
     # Long hex strings (likely tokens/keys) - 32+ hex chars
     (r'\b[0-9a-fA-F]{32,}\b', '<REDACTED_HEX>'),
@@ -44,13 +51,88 @@ PATTERNS = [
 ]
 
 # Compile patterns for performance
-COMPILED_PATTERNS = [(re.compile(pattern), replacement) for pattern, replacement in PATTERNS]
+COMPILED_PATTERNS = tuple((re.compile(pattern), replacement) for pattern, replacement in PATTERNS)
+
+
+def _scoped(pattern: str) -> str:
+    """Turn a leading global (?i) into a scoped group so it can sit in an alternation."""
+    if pattern.startswith("(?i)"):
+        return f"(?i:{pattern[4:]})"
+    return pattern
+
+
+# All patterns but the email one (see _email_spans) as one alternation so
+# contains_secrets scans the text once.
+# Only usable for detection: a single substitution pass would not see the
+# matches that earlier replacements expose (a hex key ending right before a
+# redacted sk- key only gets its word boundary once that key is replaced).
+_COMBINED = re.compile("|".join(_scoped(p) for p, _ in PATTERNS if p != _EMAIL_PATTERN))
+
+_EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "._%+-")
+_EMAIL_AT_DOMAIN = re.compile(r'@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+
+def _email_spans(text: str) -> Iterator[tuple[int, int]]:
+    """
+    Spans of the email pattern's matches, as finditer would yield them.
+
+    The pattern itself retries its local part from every character of a long
+    run with no '@' after it, which is quadratic. Here each '@' followed by a
+    valid domain is found first and the local part is the run of local
+    characters before it, never reaching back into the previous match.
+    """
+    end = 0
+    pos = 0
+    while True:
+        match = _EMAIL_AT_DOMAIN.search(text, pos)
+        if match is None:
+            return
+        at = start = match.start()
+        while start > end and text[start - 1] in _EMAIL_LOCAL_CHARS:
+            start -= 1
+        if start == at:
+            pos = at + 1  # No local part: not an email
+            continue
+        yield start, match.end()
+        end = pos = match.end()
+
+
+def _sub_emails(replacement: str, text: str) -> str:
+    """Email pattern's sub(replacement, text), in linear time."""
+    parts = []
+    end = 0
+    for start, stop in _email_spans(text):
+        parts.append(text[end:start])
+        parts.append(replacement)
+        end = stop
+    if not parts:
+        return text
+    parts.append(text[end:])
+    return "".join(parts)
+
+
+# One substitution per pattern, in PATTERNS order
+_PASSES = tuple(
+    partial(_sub_emails if pattern.pattern == _EMAIL_PATTERN else pattern.sub, replacement)
+    for pattern, replacement in COMPILED_PATTERNS
+)
+
+
+# Cheap pre-check: every pattern's match contains one of these markers
+# (both key/value patterns need a ':' or '='), so text without any of them
+# is clean and skips the per-pattern passes
+_SCREEN = re.compile(r'sk-|Bearer|OpenAI|gh[pousr]_|AKIA|@|[:=]|[0-9a-fA-F]{32}')
 
 
 def redact(text: str, max_length: Optional[int] = None) -> str:
     """
     Redact sensitive patterns from text.
 
+    Every pattern runs once, in PATTERNS order, over the previous one's
+    output. A match that only appears after a later pattern's replacement
+    (a hex run directly before a redacted password gains its word boundary
+    too late) is left in place, as in the original implementation.
+
     Args:
         text: Input text to redact
         max_length: Optional max length (truncates if longer, applies AFTER redaction)
@@ -62,8 +144,9 @@ def redact(text: str, max_length: Optional[int] = None) -> str:
         return text
 
     result = text
-    for pattern, replacement in COMPILED_PATTERNS:
-        result = pattern.sub(replacement, result)
+    if _SCREEN.search(text):
+        for substitute in _PASSES:
+            result = substitute(result)
 
     # Truncate if requested (apply AFTER redaction)
     if max_length and len(result) > max_length:
@@ -108,7 +191,6 @@ def contains_secrets(text: str) -> bool:
     if not text:
         return False
 
-    for pattern, _ in COMPILED_PATTERNS:
-        if pattern.search(text):
-            return True
-    return False
+    if _SCREEN.search(text) is None:
+        return False
+    return _COMBINED.search(text) is not None or next(_email_spans(text), None) is not None
@@ -10,11 +10,50 @@ Hybrid retrieval combining:
 - Explainable scoring
 """
 
+import heapq
 import math
+import sqlite3
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from operator import itemgetter
 from typing import Any
 
 
+# Keys of RetrievalResult.scores, besides "total"
+SCORE_COMPONENTS = ("fts", "importance", "recency", "graph")
+
+# created_at strings recur across searches (the same memories keep matching),
+# so their parsed form is cached rather than re-parsed for every scored row
+_parse_created = lru_cache(maxsize=4096)(datetime.fromisoformat)
+
+
+# Recency decay exp(-days / 365) for the first ten years, looked up by whole
+# days instead of computed per row
+_RECENCY_BY_DAY = tuple(math.exp(-days / 365) for days in range(3651))
+
+
+@lru_cache(maxsize=None)
+def _explanation(fts_band: int, importance_band: int, recency_band: int, connected: bool) -> str:
+    """Explanation text for score bands (2 = high, 1 = medium, 0 = low)."""
+    parts = [("low text relevance", "moderate text relevance", "high text relevance")[fts_band]]
+
+    if importance_band == 2:
+        parts.append("high importance")
+    elif importance_band == 1:
+        parts.append("medium importance")
+
+    if recency_band == 2:
+        parts.append("recent")
+    elif recency_band == 1:
+        parts.append("somewhat recent")
+
+    if connected:
+        parts.append("well-connected in graph")
+
+    return ", ".join(parts)
+
+
 @dataclass
 class RetrievalResult:
     """A single retrieval result with scoring explanation."""
@@ -57,7 +96,8 @@ class HybridRetrieval:
         self.embedding_model = embedding_model
 
     def search(self, query: str, top_k: int = 10, memory_type: str = None, source: str = None,
-               use_graph: bool = False, expand_entities: bool = False) -> list[RetrievalResult]:
+               use_graph: bool = False, expand_entities: bool = False,
+               memory_types: list[str] = None) -> list[RetrievalResult]:
         """
         Perform hybrid search.
 
@@ -66,6 +106,7 @@ class HybridRetrieval:
             top_k: Number of results to return
             memory_type: Optional filter by memory type
             source: Optional filter by source/project
+            memory_types: Optional list of memory types, any of which may match
             use_graph: Whether to use graph expansion
             expand_entities: Whether to expand by entity relationships
 
@@ -73,11 +114,14 @@ class HybridRetrieval:
             List of RetrievalResult with scores and explanations
         """
         # Get FTS results
-        fts_results = self.db.search_memories_fts(query, limit=top_k * 3, memory_type=memory_type, source=source)
+        fts_results = self.db.search_memories_fts(query, limit=top_k * 3, memory_type=memory_type, source=source,
+                                                  memory_types=memory_types)
 
         if not fts_results:
             # Fall back to type/source filtered memories
-            if memory_type and source:
+            if memory_types:
+                fts_results = self.db.get_memories_by_types(memory_types, source=source, limit=top_k * 3)
+            elif memory_type and source:
                 # Use SQL-level filtering to avoid truncation by global results
                 fts_results = self.db.get_memories_by_type_and_source(
                     memory_type, source, limit=top_k * 3
@@ -89,21 +133,44 @@ class HybridRetrieval:
             else:
                 fts_results = self.db.get_all_memories(limit=top_k * 3)
 
-        # Score and rank results
-        results = []
+        # Score and rank results (one clock read for the whole candidate set,
+        # weights bound to locals so the combine step skips attribute lookups)
+        now = datetime.now(timezone.utc)
+        w_fts, w_importance, w_recency, w_graph = (
+            self.FTS_WEIGHT, self.IMPORTANCE_WEIGHT, self.RECENCY_WEIGHT, self.GRAPH_WEIGHT
+        )
+        # Graph scores come from one grouped neighbor count for all candidates
+        neighbor_counts = None
+        if use_graph:
+            try:
+                neighbor_counts = self.db.get_neighbor_counts(
+                    [f"memory_{row['memory_id']}" for row in fts_results]
+                )
+            except sqlite3.Error:
+                neighbor_counts = {}
+        # Candidates carry plain component tuples; the scores dict is only
+        # built for the results that are returned
+        scored = []
         for row in fts_results:
-            scores = self._calculate_scores(row, query, use_graph=use_graph)
+            components = fts, importance, recency, graph = self._score_components(
+                row, use_graph=use_graph, now=now, neighbor_counts=neighbor_counts
+            )
             total_score = (
-                scores["fts"] * self.FTS_WEIGHT +
-                scores["importance"] * self.IMPORTANCE_WEIGHT +
-                scores["recency"] * self.RECENCY_WEIGHT +
-                scores.get("graph", 0) * self.GRAPH_WEIGHT
+                fts * w_fts +
+                importance * w_importance +
+                recency * w_recency +
+                graph * w_graph
             )
-            scores["total"] = total_score
+            scored.append((total_score, row, components))
 
-            explanation = self._explain_score(scores, query)
-
-            result = RetrievalResult(
+        # Keep the top_k by total score (nlargest is a stable sort-and-slice) and
+        # only build results and explanations for those: expansion appends
+        # after them and the final cut is top_k, so lower rows never surface
+        results = []
+        for total_score, row, components in heapq.nlargest(top_k, scored, key=itemgetter(0)):
+            scores = dict(zip(SCORE_COMPONENTS, components))
+            scores["total"] = total_score
+            results.append(RetrievalResult(
                 memory_id=row["memory_id"],
                 content=row["content"],
                 memory_type=row["memory_type"],
@@ -112,12 +179,8 @@ class HybridRetrieval:
                 created_at=row["created_at"],
                 score=total_score,
                 scores=scores,
-                explanation=explanation
-            )
-            results.append(result)
-
-        # Sort by total score
-        results.sort(key=lambda x: x.score, reverse=True)
+                explanation=self._explain_score(scores, query)
+            ))
 
         # Expand by entities if requested
         if expand_entities and self.event_store:
@@ -125,121 +188,126 @@ class HybridRetrieval:
 
         return results[:top_k]
 
-    def _calculate_scores(self, memory_row: dict, query: str, use_graph: bool = False) -> dict[str, float]:
+    def _calculate_scores(self, memory_row: dict, query: str, use_graph: bool = False,
+                          now: datetime = None,
+                          neighbor_counts: dict[str, int] = None) -> dict[str, float]:
         """Calculate component scores for a memory."""
-        scores = {}
+        return dict(zip(SCORE_COMPONENTS, self._score_components(
+            memory_row, use_graph=use_graph, now=now, neighbor_counts=neighbor_counts
+        )))
 
+    def _score_components(self, memory_row: dict, use_graph: bool = False, now: datetime = None,
+                          neighbor_counts: dict[str, int] = None) -> tuple[float, float, float, float]:
+        """Component scores for a memory, in SCORE_COMPONENTS order."""
         # FTS score (from rank)
         try:
             fts_rank = int(memory_row.get("rank", 1) or 1)
             if fts_rank <= 0:
-                scores["fts"] = 1.0  # Perfect match
+                fts = 1.0  # Perfect match
             else:
-                scores["fts"] = 1.0 / (1.0 + math.log1p(fts_rank))
+                fts = 1.0 / (1.0 + math.log1p(fts_rank))
         except (ValueError, TypeError):
-            scores["fts"] = 0.5  # Default if rank unavailable
+            fts = 0.5  # Default if rank unavailable
 
         # Importance score (0-1)
-        scores["importance"] = memory_row.get("importance", 0.5)
+        importance = memory_row.get("importance", 0.5)
 
         # Recency score (exponential decay)
-        from datetime import datetime, timezone
-        try:
-            created = datetime.fromisoformat(memory_row.get("created_at", ""))
+        if now is None:
             now = datetime.now(timezone.utc)
-            days_old = (now - created).days
-            scores["recency"] = math.exp(-days_old / 365)  # Half-life of 1 year
-        except:
-            scores["recency"] = 0.5
+        created_at = memory_row.get("created_at")
+        recency = 0.5  # Default if created_at is missing or unparseable
+        if created_at:
+            try:
+                days_old = (now - _parse_created(created_at)).days
+                if 0 <= days_old < len(_RECENCY_BY_DAY):
+                    recency = _RECENCY_BY_DAY[days_old]
+                else:
+                    recency = math.exp(-days_old / 365)  # Half-life of 1 year
+            except (ValueError, TypeError, OverflowError):
+                # Malformed string, naive timestamp, or absurdly future date
+                pass
 
         # Graph score (if enabled)
         if use_graph:
-            scores["graph"] = self._calculate_graph_score(memory_row.get("memory_id"))
+            graph = self._calculate_graph_score(memory_row.get("memory_id"), neighbor_counts)
         else:
-            scores["graph"] = 0.0
+            graph = 0.0
 
-        return scores
+        return fts, importance, recency, graph
 
-    def _calculate_graph_score(self, memory_id: str) -> float:
+    def _calculate_graph_score(self, memory_id: str, neighbor_counts: dict[str, int] = None) -> float:
         """Calculate score based on entity connections."""
         # Get entities linked to this memory
         # This is a simplified implementation
+        entity_id = f"memory_{memory_id}"
+        if neighbor_counts is not None:
+            # Precomputed by search() for the whole candidate set
+            return min(1.0, neighbor_counts.get(entity_id, 0) / 10.0)
         try:
-            entity_id = f"memory_{memory_id}"
             neighbors = self.db.get_neighbors(entity_id)
             if neighbors:
                 # Score based on number of connections
                 return min(1.0, len(neighbors) / 10.0)
-        except:
+        except sqlite3.Error:
             pass
         return 0.0
 
     def _explain_score(self, scores: dict[str, float], query: str) -> str:
         """Generate human-readable explanation of scoring."""
-        parts = []
-
-        if scores.get("fts", 0) > 0.5:
-            parts.append("high text relevance")
-        elif scores.get("fts", 0) > 0.2:
-            parts.append("moderate text relevance")
-        else:
-            parts.append("low text relevance")
-
-        if scores.get("importance", 0) > 0.7:
-            parts.append("high importance")
-        elif scores.get("importance", 0) > 0.4:
-            parts.append("medium importance")
-
-        if scores.get("recency", 0) > 0.7:
-            parts.append("recent")
-        elif scores.get("recency", 0) > 0.3:
-            parts.append("somewhat recent")
-
-        if scores.get("graph", 0) > 0.3:
-            parts.append("well-connected in graph")
-
-        if not parts:
-            parts.append("default relevance")
-
-        return ", ".join(parts)
+        # Only the threshold bands matter, so the text is cached per band
+        fts = scores.get("fts", 0)
+        importance = scores.get("importance", 0)
+        recency = scores.get("recency", 0)
+        return _explanation(
+            2 if fts > 0.5 else 1 if fts > 0.2 else 0,
+            2 if importance > 0.7 else 1 if importance > 0.4 else 0,
+            2 if recency > 0.7 else 1 if recency > 0.3 else 0,
+            scores.get("graph", 0) > 0.3,
+        )
 
     def _expand_by_entities(self, results: list[RetrievalResult], query: str) -> list[RetrievalResult]:
         """Expand results by following entity relationships."""
         expanded_ids = {r.memory_id for r in results}
         expanded_results = list(results)
 
-        for result in results[:3]:  # Expand top 3
-            try:
-                entity_id = f"memory_{result.memory_id}"
-                neighbors = self.db.get_neighbors(entity_id)
-
-                for neighbor in neighbors:
+        # Neighbors of the top 3 and their memories are fetched with one
+        # batched query each, then visited in the same order as before
+        seed_ids = [f"memory_{result.memory_id}" for result in results[:3]]
+        try:
+            neighbors_by_seed = self.db.get_neighbors_batch(seed_ids)
+            candidates = []
+            for seed_id in seed_ids:
+                for neighbor in neighbors_by_seed[seed_id]:
                     neighbor_id = neighbor.get("entity_id", "").replace("memory_", "")
                     if neighbor_id and neighbor_id not in expanded_ids:
-                        # Fetch the memory
-                        memory = self.db.get_memory(neighbor_id)
-                        if memory:
-                            scores = {
-                                "fts": 0.1,
-                                "importance": neighbor.get("weight", 0.5),
-                                "recency": 0.5,
-                                "graph": 0.8,
-                                "total": 0.3
-                            }
-                            expanded_results.append(RetrievalResult(
-                                memory_id=memory["memory_id"],
-                                content=memory["content"],
-                                memory_type=memory["memory_type"],
-                                source=memory["source"],
-                                importance=memory["importance"],
-                                created_at=memory["created_at"],
-                                score=0.3,
-                                scores=scores,
-                                explanation="found via entity expansion"
-                            ))
-                            expanded_ids.add(neighbor_id)
-            except:
-                continue
+                        candidates.append((neighbor_id, neighbor))
+            memories = self.db.get_memories([neighbor_id for neighbor_id, _ in candidates])
+        except sqlite3.Error:
+            return expanded_results
+
+        for neighbor_id, neighbor in candidates:
+            memory = memories.get(neighbor_id)
+            if memory and neighbor_id not in expanded_ids:
+                scores = {
+                    "fts": 0.1,
+                    "importance": neighbor.get("weight", 0.5),
+                    "recency": 0.5,
+                    "graph": 0.8,
+                    "total": 0.3
+                }
+                expanded_results.append(RetrievalResult(
+                    memory_id=memory["memory_id"],
+                    content=memory["content"],
+                    memory_type=memory["memory_type"],
+                    source=memory["source"],
+                    importance=memory["importance"],
+                    created_at=memory["created_at"],
+                    score=0.3,
+                    scores=scores,
+                    explanation="found via entity expansion"
+                ))
+                expanded_ids.add(neighbor_id)
 
         return expanded_results
 
@@ -259,14 +327,15 @@ class HybridRetrieval:
         # Get results
         results = self.search(query, top_k=20, memory_type=memory_type, use_graph=True)
 
-        # Build context
+        # Build context, collecting sources (first-seen order) as we go
         memories = []
-        total_chars = 0
+        sources = {}
+        total_tokens = 0
 
         for result in results:
             # Rough token estimate: 1 token ≈ 4 characters
             estimated_tokens = len(result.content) // 4
-            if total_chars + estimated_tokens > max_tokens * 4:
+            if total_tokens + estimated_tokens > max_tokens:
                 break
 
             memories.append({
@@ -277,12 +346,14 @@ class HybridRetrieval:
                 "score": result.score,
                 "explanation": result.explanation
             })
-            total_chars += estimated_tokens
+            if result.source:
+                sources[result.source] = None
+            total_tokens += estimated_tokens
 
         return {
             "query": query,
             "memories": memories,
             "count": len(memories),
-            "token_estimate": total_chars // 4,
-            "sources": list(set(m.get("source") for m in memories if m.get("source")))
+            "token_estimate": total_tokens,
+            "sources": list(sources)
         }
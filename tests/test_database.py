@@ -0,0 +1,199 @@
+# Database Tests
+# SPDX-License-Identifier: AGPL-3.0
+
+import tempfile
+import threading
+import pytest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from memory_hub.database import MemoryDatabase, _utc_now_iso
+
+
+@pytest.fixture
+def db():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = MemoryDatabase(Path(tmpdir) / "memory.db")
+        yield database
+        database.close()
+
+
+class TestTimestamps:
+    """Test the cached UTC timestamp formatter."""
+
+    def test_format_always_has_microseconds(self):
+        """Timestamps always carry a six-digit fraction and a UTC offset."""
+        stamp = _utc_now_iso()
+        assert stamp.endswith("+00:00")
+        assert len(stamp.split(".")[1]) == len("000000+00:00")
+
+    def test_threads_stay_within_clock(self):
+        """Timestamps taken across threads fall within the calls' wall-clock window."""
+        stamps = []
+
+        def worker():
+            for _ in range(2000):
+                stamps.append(_utc_now_iso())
+
+        # Slack for rounding: the formatter truncates microseconds, datetime rounds
+        before = datetime.now(timezone.utc) - timedelta(milliseconds=1)
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        after = datetime.now(timezone.utc) + timedelta(milliseconds=1)
+
+        assert all(before <= datetime.fromisoformat(stamp) <= after for stamp in stamps)
+
+
+class TestTransactions:
+    """Test grouping writes with MemoryDatabase.transaction()."""
+
+    def test_transaction_commits_once(self, db):
+        """Writes inside the block are visible after it exits."""
+        with db.transaction():
+            db.insert_memory("m1", "first")
+            db.insert_memories([{"memory_id": "m2", "content": "second"}])
+            assert db.conn.in_transaction
+
+        assert not db.conn.in_transaction
+        assert db.count_memories() == 2
+
+    def test_transaction_rolls_back_on_error(self, db):
+        """An exception discards every write in the block."""
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.insert_memory("m1", "first")
+                raise RuntimeError("boom")
+
+        assert db.count_memories() == 0
+
+
+class TestEntityCache:
+    """Test the cached entity-by-type lookup."""
+
+    def test_cache_invalidated_by_insert(self, db):
+        """A new entity is visible on the next cached lookup."""
+        db.insert_entity("e1", "concept", "one")
+        first = db.get_entities_by_type_cached("concept")
+        assert db.get_entities_by_type_cached("concept") is first
+
+        db.insert_entity("e2", "concept", "two")
+        assert [e["entity_id"] for e in db.get_entities_by_type_cached("concept")] == ["e1", "e2"]
+        assert len(db.get_entities_by_type_cached("concept", limit=1)) == 1
+
+
+class TestBatchedLookups:
+    """Test multi-ID graph and memory lookups."""
+
+    def test_neighbors_batch_matches_single(self, db):
+        """Batched neighbors and counts agree with get_neighbors."""
+        for name in ("a", "b", "c"):
+            db.insert_entity(name, "concept", name)
+        db.insert_edge("e1", "a", "b", "uses")
+        db.insert_edge("e2", "b", "a", "uses")
+        db.insert_edge("e3", "c", "a", "owns", weight=0.5)
+        db.insert_edge("e4", "a", "a", "self")
+
+        batch = db.get_neighbors_batch(["a", "b", "missing"])
+        for entity_id in ("a", "b", "missing"):
+            assert batch[entity_id] == db.get_neighbors(entity_id)
+
+        counts = db.get_neighbor_counts(["a", "b", "c", "missing"])
+        assert counts == {e: len(db.get_neighbors(e)) for e in ("a", "b", "c")}
+
+    def test_get_memories(self, db):
+        """Memories are keyed by ID and unknown IDs are skipped."""
+        db.insert_memory("m1", "first")
+        db.insert_memory("m2", "second")
+        memories = db.get_memories(["m2", "m1", "nope"])
+        assert set(memories) == {"m1", "m2"}
+        assert memories["m2"]["content"] == "second"
+
+
+class TestFtsSearch:
+    """Test filtered full-text search."""
+
+    def test_filter_beyond_overfetch_window(self, db):
+        """Matches ranked below the overfetch window still pass the source filter."""
+        limit = 10
+        db.insert_memories([
+            {"memory_id": f"other_{i}", "content": "python python", "source": "other"}
+            for i in range(limit * MemoryDatabase.FTS_FILTER_OVERFETCH * 3)
+        ])
+        db.insert_memories([
+            {"memory_id": f"proj_{i}", "content": f"python notes {i} among many other words",
+             "source": "proj"}
+            for i in range(3)
+        ])
+
+        results = db.search_memories_fts("python", limit=limit, source="proj")
+        assert sorted(r["memory_id"] for r in results) == ["proj_0", "proj_1", "proj_2"]
+
+        results = db.search_memories_fts("python", limit=limit, source="other")
+        assert len(results) == limit
+
+
+class TestQueryPlans:
+    """Test that listing queries are served by indexes."""
+
+    @pytest.mark.parametrize("where, params", [
+        ("memory_type = ? AND source = ?", ("note", "proj")),
+        ("memory_type = ?", ("note",)),
+        ("source = ?", ("proj",)),
+    ])
+    def test_fallback_listing_uses_index(self, db, where, params):
+        """Fallback listings search an index and need no sort step."""
+        plan = " ".join(row[-1] for row in db.conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM memories WHERE {where} "
+            "ORDER BY importance DESC, created_at DESC LIMIT 10", params
+        ))
+        assert "USING INDEX" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestThreadConnections:
+    """Test per-thread connections."""
+
+    def test_threads_get_own_connection(self, db):
+        """Another thread reads committed rows through its own connection."""
+        db.insert_memory("m1", "first")
+
+        seen = {}
+
+        def worker():
+            seen["conn"] = db.conn
+            seen["memory"] = db.get_memory("m1")
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert seen["conn"] is not db.conn
+        assert seen["memory"]["content"] == "first"
+
+    def test_close_twice(self, db):
+        """A second close is a no-op."""
+        db.insert_memory("m1", "first")
+        db.close()
+        db.close()
+
+    def test_close_from_thread_without_connection(self, db):
+        """Closing from a thread that never queried opens no connection."""
+        opened = []
+        db._connect = lambda: opened.append(1)
+        errors = []
+
+        def closer():
+            try:
+                db.close()
+            except Exception as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=closer)
+        thread.start()
+        thread.join()
+
+        assert errors == []
+        assert opened == []
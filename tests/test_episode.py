@@ -11,21 +11,19 @@ Tests for Episode Memory system:
 
 import json
 import os
-import sys
 import tempfile
 import pytest
 from pathlib import Path
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from memory_hub.episode import (
     intent_fingerprint,
     calculate_score,
     store_episode,
+    store_episodes,
     retrieve_episodes,
     assemble_episodes_context,
     create_episode,
+    create_episodes,
     extract_cues,
     mark_episode_used,
     bump_episode_strength,
@@ -33,6 +31,7 @@ from memory_hub.episode import (
     _USED_EPISODES,
 )
 from memory_hub import create_database, create_event_store
+from memory_hub import episode as episode_module
 
 
 class TestIntentFingerprint:
@@ -116,6 +115,27 @@ class TestScoring:
         result = calculate_score("failure", 1, 0, ["data loss"])
         assert result["score"] == 0  # 25 - 40, clamped to 0
 
+    def test_signature_matching_several_patterns(self):
+        """A free-form signature takes the first table pattern it contains."""
+        result = calculate_score("success", 1, 0, ["timeout followed by data loss"])
+        assert result["score"] == 45  # 85 - 40 (data loss)
+
+        result = calculate_score("success", 1, 0, ["unauthorized, then a false green"])
+        assert result["score"] == 65  # 85 - 20 (false green)
+
+    def test_signature_containing_earlier_pattern(self):
+        """A table key containing an earlier pattern takes that pattern's penalty."""
+        result = calculate_score("success", 1, 0, ["gateway timeout"])
+        assert result["score"] == 75  # 85 - 10 (timeout comes first)
+
+    def test_repeated_signatures(self):
+        """Each occurrence of a signature is penalized."""
+        result = calculate_score("success", 1, 0, ["HTTP 401", "HTTP 401"])
+        assert result["score"] == 55  # 85 - 15 - 15
+
+        result = calculate_score("success", 1, 0, ["HTTP 401"])
+        assert result["score"] == 70  # Not carried over from the call above
+
     def test_bonuses(self):
         """Bonus points."""
         result = calculate_score("success", 1, 0, [], has_regression_test=True)
@@ -185,6 +205,28 @@ class TestEpisodeStorage:
         episode_id = store_episode(episode, db, events)
         assert episode_id is not None
 
+    def test_store_episodes_bulk(self, db_setup):
+        """Store several episodes in one batch."""
+        db, events, tmpdir = db_setup
+
+        episodes = create_episodes([
+            dict(
+                episode_id=f"bulk{i}",
+                project_id="testproj",
+                intent=f"Bulk episode {i}",
+                cues={"entities": [], "error_signatures": [], "tools": [], "files": []},
+                path=[f"step {i}"],
+                outcome="success",
+            )
+            for i in range(3)
+        ])
+        assert len({ep["created_at"] for ep in episodes}) == 1
+
+        ids = store_episodes(episodes, db, events)
+        assert ids == ["bulk0", "bulk1", "bulk2"]
+        assert events.count() == 3
+        assert db.get_memory("bulk1")["event_id"] is not None
+
     def test_retrieve_episodes(self, db_setup):
         """Retrieve episodes by prompt."""
         db, events, tmpdir = db_setup
@@ -335,6 +377,19 @@ class TestStrengthBump:
         assert "ep1" in used
         assert "ep2" in used
 
+    def test_used_fingerprints_bounded(self, monkeypatch):
+        """Least recently used fingerprint is evicted past the limit."""
+        _USED_EPISODES.clear()
+        monkeypatch.setattr(episode_module, "MAX_USED_FINGERPRINTS", 2)
+
+        mark_episode_used("fp1", "ep1")
+        mark_episode_used("fp2", "ep1")
+        mark_episode_used("fp1", "ep2")
+        mark_episode_used("fp3", "ep1")
+
+        assert get_used_episodes("fp2") == []
+        assert get_used_episodes("fp1") == ["ep1", "ep2"]
+
     def test_strength_bump_cap(self):
         """Strength bump should cap at 1.0."""
         _USED_EPISODES.clear()
@@ -0,0 +1,168 @@
+# Event Store Tests
+# SPDX-License-Identifier: AGPL-3.0
+
+import tempfile
+import threading
+import uuid
+import pytest
+from pathlib import Path
+
+from memory_hub.event_store import EventStore, _new_uuid4
+
+
+class TestBatchedWrites:
+    """Test buffered and bulk event appends."""
+
+    @pytest.fixture
+    def tmpdir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_append_many(self, tmpdir):
+        """append_many writes every event in order."""
+        es = EventStore(tmpdir)
+        ids = es.append_many([("a", {"n": 1}), ("b", {"n": 2}, {"correlation_id": "c1"})])
+
+        events = list(es.read_all())
+        assert [e["event_id"] for e in events] == ids
+        assert events[1]["metadata"]["correlation_id"] == "c1"
+
+    def test_event_ids_are_uuid4(self, tmpdir):
+        """Event IDs are unique canonical UUID4 strings."""
+        es = EventStore(tmpdir)
+        ids = es.append_many([("a", {"n": i}) for i in range(600)])
+
+        assert len(set(ids)) == len(ids)
+        for event_id in ids:
+            parsed = uuid.UUID(event_id)
+            assert parsed.version == 4 and str(parsed) == event_id
+
+    def test_event_ids_unique_across_threads(self):
+        """Threads drawing IDs while the pool empties all get unique IDs."""
+        results = [[] for _ in range(8)]
+
+        def draw(out):
+            out.extend(_new_uuid4() for _ in range(2000))
+
+        threads = [threading.Thread(target=draw, args=(out,)) for out in results]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        ids = [event_id for out in results for event_id in out]
+        assert len(ids) == 16000 and len(set(ids)) == len(ids)
+
+    def test_batched_append_deferred_until_flush(self, tmpdir):
+        """Batched mode keeps events in memory until flush."""
+        es = EventStore(tmpdir, batched=True)
+        es.append("memory_created", {"content": "hello"})
+
+        assert es.events_file.read_text() == ""
+        es.flush()
+        assert EventStore(tmpdir).count() == 1
+
+    def test_batched_writes_out_when_full(self, tmpdir):
+        """A full batch is written without waiting for flush."""
+        es = EventStore(tmpdir, batched=True)
+        es.MAX_PENDING = 3
+        for n in range(4):
+            es.append("memory_created", {"n": n})
+
+        assert EventStore(tmpdir).count() == 3
+        assert es.count() == 4
+
+    def test_batched_reads_see_pending(self, tmpdir):
+        """Reads flush pending events first."""
+        es = EventStore(tmpdir, batched=True)
+        es.append("memory_created", {"content": "hello"})
+        assert es.count() == 1
+
+
+    def test_close_flushes_and_allows_reuse(self, tmpdir):
+        """close() writes pending events; later appends reopen the log."""
+        es = EventStore(tmpdir, batched=True)
+        es.append("memory_created", {"content": "hello"})
+        es.close()
+        assert EventStore(tmpdir).count() == 1
+
+        es.batched = False
+        es.append("memory_created", {"content": "again"})
+        es.close()
+        assert EventStore(tmpdir).count() == 2
+
+
+class TestCount:
+    """Test incremental event counting."""
+
+    def test_count_tracks_appends_and_partial_lines(self):
+        """Repeated counts see new events, blank lines and an unterminated tail."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            es = EventStore(Path(tmpdir))
+            es.append("a", {})
+            assert es.count() == 1
+            es.append("b", {})
+            assert es.count() == 2
+
+            with open(es.events_file, "a", encoding="utf-8") as f:
+                f.write('\n{"event_type": "c"')
+            assert es.count() == 3
+            with open(es.events_file, "a", encoding="utf-8") as f:
+                f.write(', "payload": {}}\n')
+            assert es.count() == 3
+
+            es.events_file.write_text("")
+            assert es.count() == 0
+
+
+class TestFilteredReads:
+    """Test type and correlation lookups."""
+
+    def test_get_by_type_and_correlation(self):
+        """Only events whose field matches are returned, not mere mentions."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            es = EventStore(Path(tmpdir))
+            es.append("memory_created", {"content": "note about memory_deleted"}, {"correlation_id": "c1"})
+            deleted_id = es.append("memory_deleted", {"memory_id": "m1"}, {"correlation_id": "c2"})
+            es.append("memory_created", {"content": "c2"})
+
+            assert [e["event_id"] for e in es.get_by_type("memory_deleted")] == [deleted_id]
+            assert [e["event_id"] for e in es.get_by_correlation("c2")] == [deleted_id]
+            assert len(list(es.get_by_type("memory_created"))) == 2
+
+    def test_search_matches_payload_only(self):
+        """Search matches payload text case-insensitively, including JSON punctuation."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            es = EventStore(Path(tmpdir))
+            hit = es.append("memory_created", {"content": "Rollback Plan", "n": 1})
+            es.append("memory_rollback", {"content": "other"})
+
+            assert [e["event_id"] for e in es.search("rollback")] == [hit]
+            assert [e["event_id"] for e in es.search('"n": 1')] == [hit]
+
+
+class TestExport:
+    """Test event export."""
+
+    def test_plain_export_copies_log(self):
+        """Unredacted export is a byte copy, including buffered events."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            es = EventStore(Path(tmpdir) / "events", batched=True)
+            es.append("memory_created", {"content": "hello"})
+            out = Path(tmpdir) / "export.jsonl"
+            es.export(out)
+            assert out.read_bytes() == es.events_file.read_bytes()
+
+    def test_redacted_export(self):
+        """Redacted export masks sensitive payload keys."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            es = EventStore(Path(tmpdir) / "events")
+            es.append("memory_created", {"content": "hello", "api_key": "s3cr3t-value"})
+            out = Path(tmpdir) / "export.jsonl"
+            es.export(out, redact=True)
+            assert "s3cr3t-value" not in out.read_text()
+            assert "[REDACTED]" in out.read_text()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
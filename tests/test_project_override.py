@@ -2,8 +2,6 @@
 """Regression test for project override with many global memories."""
 import sys
 import os
-import tempfile
-import shutil
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -15,23 +13,21 @@ from memory_hub.context_assembler import ContextAssembler
 
 def test_project_override_with_many_global_memories():
     """Test that project override retrieves project memories even with many global memories."""
-    # Create temp directory
-    temp_dir = tempfile.mkdtemp()
+    # Initialize an in-memory database (the scenario needs no file or WAL)
+    db = MemoryDatabase(":memory:")
     try:
-        # Initialize database
-        db_path = os.path.join(temp_dir, 'test.db')
-        db = MemoryDatabase(db_path)
-
-        # Insert many global memories of type "note"
+        # Insert many global memories of type "note" in one transaction
         # These should NOT appear in project results
-        for i in range(50):
-            db.insert_memory(
-                memory_id=f"global_{i}",
-                content=f"Global memory content {i}",
-                memory_type="note",
-                source="other_project",
-                importance=0.5
-            )
+        db.insert_memories([
+            {
+                "memory_id": f"global_{i}",
+                "content": f"Global memory content {i}",
+                "memory_type": "note",
+                "source": "other_project",
+                "importance": 0.5,
+            }
+            for i in range(50)
+        ])
 
         # Insert a few project-specific memories
         # These SHOULD appear in project results
@@ -57,26 +53,24 @@ def test_project_override_with_many_global_memories():
             source=project_name
         )
 
-        # Verify: Should return project memories even with many global memories
-        project_results = [r for r in results if r.source == project_name]
-
+        # Verify: Should return project memories even with many global memories,
+        # and the source filter (applied in SQL) must leave no global ones
         print(f"Total results: {len(results)}")
-        print(f"Project results: {len(project_results)}")
 
-        if len(project_results) == 0:
-            print("FAIL: No project memories returned!")
-            return False
+        assert results, "No project memories returned!"
+        assert all(r.source == project_name for r in results), "Memories from other sources returned!"
 
         print("PASS: Project memories retrieved despite many global memories")
-        for r in project_results[:3]:
+        for r in results[:3]:
             print(f"  - {r.memory_id}: {r.content[:50]}...")
 
-        return True
-
     finally:
-        shutil.rmtree(temp_dir)
+        db.close()
 
 
 if __name__ == '__main__':
-    success = test_project_override_with_many_global_memories()
-    sys.exit(0 if success else 1)
+    try:
+        test_project_override_with_many_global_memories()
+    except AssertionError as exc:
+        print(f"FAIL: {exc}")
+        sys.exit(1)